@@ -0,0 +1,101 @@
+import asyncio
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from apps.common.authentication import CachedJWTAuthentication, user_cache
+from apps.common.events import get_channel_layer, get_user_group, redeem_stream_ticket
+
+
+def authenticate(scope):
+    """
+    The user of the JWT in the Authorization header, or of a ``ticket`` query parameter from
+    EventTicketView, None without either. JWTs are not read from the query string, it is logged.
+    """
+    headers = dict(scope["headers"])
+    if b"authorization" in headers:
+        authentication = CachedJWTAuthentication()
+        raw_token = authentication.get_raw_token(headers[b"authorization"])
+        return authentication.get_user(authentication.get_validated_token(raw_token)) if raw_token else None
+    tickets = parse_qs(scope.get("query_string", b"").decode()).get("ticket")
+    user_id = redeem_stream_ticket(tickets[0]) if tickets else None
+    user = user_cache.get(user_id) if user_id is not None else None
+    return user if user is not None and user.is_active else None
+
+
+class EventStreamApplication:
+    """
+    Streams the events published to the requesting user as ``text/event-stream``, one long-lived
+    response per client instead of clients polling the list endpoints.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["method"] != "GET":
+            return await self.send_error(send, 405, b"Method not allowed")
+        try:
+            user = await sync_to_async(authenticate)(scope)
+        except (AuthenticationFailed, InvalidToken, TokenError):
+            user = None
+        if user is None:
+            return await self.send_error(send, 401, b"Authentication credentials were not provided or are invalid")
+
+        subscription = get_channel_layer().subscribe(get_user_group(user.pk))
+        try:
+            await subscription.open()
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    # Keeps nginx from buffering the stream.
+                    (b"x-accel-buffering", b"no"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": b": connected\n\n", "more_body": True})
+            await self.stream(subscription, receive, send)
+        finally:
+            await subscription.close()
+
+    async def stream(self, subscription, receive, send):
+        disconnected = asyncio.ensure_future(self.wait_for_disconnect(receive))
+        try:
+            while True:
+                message = asyncio.ensure_future(subscription.get(timeout=settings.EVENTS_KEEPALIVE_SECONDS))
+                await asyncio.wait([message, disconnected], return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    message.cancel()
+                    return
+                data = message.result()
+                body = f"data: {data}\n\n".encode() if data is not None else b": keepalive\n\n"
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+        finally:
+            disconnected.cancel()
+
+    @staticmethod
+    async def wait_for_disconnect(receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    @staticmethod
+    async def send_error(send, status, detail):
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": detail})
+
+
+class PathRouter:
+    """Sends the HTTP requests of ``routes`` path prefixes to their application, everything else to ``default``."""
+
+    def __init__(self, routes, default):
+        self.routes = routes
+        self.default = default
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            for prefix, application in self.routes.items():
+                if scope["path"] == prefix or scope["path"].startswith(prefix + "/"):
+                    return await application(scope, receive, send)
+        return await self.default(scope, receive, send)
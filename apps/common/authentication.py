@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+
+class UserCache:
+    """
+    Users by id, read from a small in-process LRU, then from the shared cache, then from the
+    database. ``invalidate()`` clears this process and the shared cache, other processes drop
+    their copy after ``local_ttl`` seconds.
+
+    Only the ``fields`` that authentication and permissions read are cached, never the password
+    hash. ``get()`` returns a user loaded with just these, the other fields are deferred and read
+    from the database when accessed, so saving it writes back only the cached columns.
+    """
+
+    fields = ("id", "username", "email", "first_name", "last_name", "is_active", "is_staff", "is_superuser")
+
+    def __init__(self, local_size, local_ttl, shared_ttl):
+        self.local_size = local_size
+        self.local_ttl = local_ttl
+        self.shared_ttl = shared_ttl
+        self.local = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_key(self, user_id):
+        return f"auth-user:{user_id}"
+
+    def get(self, user_id):
+        values = self.get_local(user_id)
+        if values is None:
+            values = cache.get(self.get_key(user_id))
+            if values is None:
+                users = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+                values = users.values(*self.fields).first()
+                if values is None:
+                    return None
+                cache.set(self.get_key(user_id), values, self.shared_ttl)
+            self.set_local(user_id, values)
+        model = get_user_model()
+        # from_db() takes the loaded fields in model order and defers the rest.
+        names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+        return model.from_db(model.objects.db, names, [values[name] for name in names])
+
+    def get_local(self, user_id):
+        with self.lock:
+            entry = self.local.get(user_id)
+            if entry is None:
+                return None
+            values, expires_at = entry
+            if expires_at < time.monotonic():
+                del self.local[user_id]
+                return None
+            self.local.move_to_end(user_id)
+            return values
+
+    def set_local(self, user_id, values):
+        with self.lock:
+            self.local[user_id] = (values, time.monotonic() + self.local_ttl)
+            self.local.move_to_end(user_id)
+            while len(self.local) > self.local_size:
+                self.local.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.local.pop(user_id, None)
+        cache.delete(self.get_key(user_id))
+
+
+user_cache = UserCache(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_LOCAL_TTL,
+                       settings.AUTH_USER_CACHE_TTL)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves the token's user through ``user_cache`` instead of a query per request."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = user_cache.get(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
@@ -0,0 +1,187 @@
+import secrets
+import time
+
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django_redis.cache import RedisCache
+
+from apps.common.metrics import record_cache_access
+
+_missing = object()
+_tracked_stats = []
+
+
+class InstrumentedCacheMixin:
+    """Counts the hits and misses of ``get`` in the metrics of the current request."""
+
+    def get(self, key, default=None, version=None, **kwargs):
+        value = super().get(key, _missing, version=version, **kwargs)
+        if value is _missing:
+            record_cache_access(misses=1)
+            return default
+        record_cache_access(hits=1)
+        return value
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
+
+
+class InstrumentedRedisCache(InstrumentedCacheMixin, RedisCache):
+    def get_many(self, keys, version=None, **kwargs):
+        # Unlike BaseCache.get_many() this does not go through get().
+        keys = list(keys)
+        values = super().get_many(keys, version=version, **kwargs)
+        record_cache_access(hits=len(values), misses=len(keys) - len(values))
+        return values
+
+
+def increment(key, initial=1):
+    """Increment a counter that never expires, creating it with ``initial`` on first use."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, initial, timeout=None):
+            cache.incr(key)
+
+
+class CacheStats:
+    """
+    Hit and miss counters of one named cache, kept in the cache itself so every worker adds to
+    the same numbers. ``cache_stats()`` reports all of them.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        _tracked_stats.append(self)
+
+    def get_key(self, outcome):
+        return f"cache-stats:{self.name}:{outcome}"
+
+    def record(self, hit):
+        increment(self.get_key("hits" if hit else "misses"))
+
+    def as_dict(self):
+        values = cache.get_many([self.get_key("hits"), self.get_key("misses")])
+        hits, misses = values.get(self.get_key("hits"), 0), values.get(self.get_key("misses"), 0)
+        total = hits + misses
+        return {"hits": hits, "misses": misses, "hit_ratio": round(hits / total, 4) if total else None}
+
+
+def cache_stats():
+    return {stats.name: stats.as_dict() for stats in _tracked_stats}
+
+
+class AggregateCache:
+    """
+    Per-scope (usually per-user) cache for expensive aggregates.
+
+    Only the worker holding the scope's lock recomputes an expired entry. The others keep serving
+    the stale value for up to ``stale_ttl`` seconds, or briefly wait for the result when there is
+    none. ``invalidate()`` bumps the scope's generation, entries computed for an older generation
+    are never served. Generations are ChangeCounters, an evicted one does not restart at a value
+    old entries were computed for.
+    """
+
+    lock_poll_interval = 0.05
+
+    def __init__(self, name, ttl, stale_ttl, lock_timeout=10):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.lock_timeout = lock_timeout
+        self.stats = CacheStats(name)
+        self.generations = ChangeCounter(f"aggregate:{name}")
+
+    def get_entry_key(self, scope):
+        return f"aggregate:{self.name}:{scope}"
+
+    def get_lock_key(self, scope):
+        return f"aggregate:{self.name}:{scope}:lock"
+
+    def get(self, scope, compute):
+        entry_key, generation_key = self.get_entry_key(scope), self.generations.get_key(scope)
+        values = cache.get_many([entry_key, generation_key])
+        entry, generation = values.get(entry_key), values.get(generation_key)
+        if generation is None:
+            generation = self.generations.get(scope)
+        current = entry is not None and entry["generation"] == generation
+        if current and entry["fresh_until"] > time.time():
+            self.stats.record(hit=True)
+            return entry["value"]
+
+        self.stats.record(hit=False)
+        lock_key, token = self.get_lock_key(scope), secrets.token_hex(16)
+        if cache.add(lock_key, token, self.lock_timeout):
+            try:
+                return self.compute(scope, compute, generation)
+            finally:
+                # After lock_timeout the lock may belong to another worker already.
+                if cache.get(lock_key) == token:
+                    cache.delete(lock_key)
+        if current:
+            return entry["value"]
+        return self.wait(scope, compute, generation)
+
+    def compute(self, scope, compute, generation):
+        value = compute()
+        entry = {"value": value, "generation": generation, "fresh_until": time.time() + self.ttl}
+        cache.set(self.get_entry_key(scope), entry, self.ttl + self.stale_ttl)
+        return value
+
+    def wait(self, scope, compute, generation):
+        """Wait for the worker holding the lock, compute it here if it does not finish in time."""
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.lock_poll_interval)
+            entry = cache.get(self.get_entry_key(scope))
+            if entry is not None and entry["generation"] == generation:
+                return entry["value"]
+        return self.compute(scope, compute, generation)
+
+    def invalidate(self, scopes):
+        """
+        Expire the entries of ``scopes`` now and once more after commit, so a value computed from
+        rows read before the commit is not kept.
+        """
+        self.generations.bump(scopes)
+
+
+class ChangeCounter:
+    """
+    Per-scope counters bumped on every change of the data behind the scope, cheap enough to read
+    on each request (ETags). New counters start at the current time in microseconds instead of 1,
+    so a counter that was evicted never goes back to a value an earlier ETag was built from.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def get_key(self, scope):
+        return f"changes:{self.name}:{scope}"
+
+    @staticmethod
+    def initial_value():
+        return time.time_ns() // 1000
+
+    def get(self, scope):
+        key = self.get_key(scope)
+        value = cache.get(key)
+        if value is None:
+            cache.add(key, self.initial_value(), timeout=None)
+            value = cache.get(key)
+        return value
+
+    def bump(self, scopes):
+        """Bump ``scopes`` now and once more after commit, like AggregateCache.invalidate()."""
+        scopes = set(scopes) - {None}
+        if not scopes:
+            return
+
+        def bump():
+            for scope in scopes:
+                increment(self.get_key(scope), initial=self.initial_value())
+
+        bump()
+        transaction.on_commit(bump)
@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from apps.common.metrics import current_metrics, track_queries
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.CONCURRENT_SECTIONS_WORKERS,
+                                       thread_name_prefix="sections")
+    return _executor
+
+
+def run_section(function):
+    # Pool threads keep their own connections, expire them like a request would.
+    close_old_connections()
+    try:
+        with track_queries(current_metrics()):
+            return function()
+    finally:
+        close_old_connections()
+
+
+def run_concurrently(sections):
+    """
+    Call the ``{name: function}`` sections in the shared thread pool and return ``{name: result}``.
+    Inside a transaction they run inline, other threads use their own connections and would not
+    see its uncommitted rows (this is also what keeps them inline in TestCase).
+    """
+    if settings.CONCURRENT_SECTIONS_WORKERS < 2 or any(
+            connection.in_atomic_block for connection in connections.all()):
+        return {name: function() for name, function in sections.items()}
+    futures = {
+        name: get_executor().submit(copy_context().run, run_section, function)
+        for name, function in sections.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import logging
+import secrets
+import threading
+from collections import defaultdict, deque
+
+import redis
+import redis.asyncio
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+
+logger = logging.getLogger(__name__)
+
+_channel_layer = None
+
+
+class InMemorySubscription:
+    """Messages of one group for one listener, delivered from any thread."""
+
+    def __init__(self, layer, group):
+        self.layer = layer
+        self.group = group
+        self.messages = deque()
+        self.loop = None
+        self.waiter = None
+
+    async def open(self):
+        self.loop = asyncio.get_running_loop()
+
+    def deliver(self, message):
+        self.messages.append(message)
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.wake)
+
+    def wake(self):
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    async def get(self, timeout=None):
+        """The next message, or None after ``timeout`` seconds."""
+        # Wake up whichever loop is waiting, synchronous callers get a new one per call.
+        await self.open()
+        if not self.messages:
+            self.waiter = self.loop.create_future()
+            try:
+                await asyncio.wait_for(self.waiter, timeout)
+            except asyncio.TimeoutError:
+                return None
+            finally:
+                self.waiter = None
+        return self.messages.popleft() if self.messages else None
+
+    async def close(self):
+        self.layer.unsubscribe(self)
+
+
+class InMemoryChannelLayer:
+    """Process-local publish/subscribe, for tests and single-process development servers."""
+
+    def __init__(self, **config):
+        self.lock = threading.Lock()
+        self.groups = defaultdict(set)
+
+    def publish(self, group, message):
+        with self.lock:
+            subscriptions = list(self.groups.get(group, ()))
+        for subscription in subscriptions:
+            subscription.deliver(message)
+
+    def subscribe(self, group):
+        subscription = InMemorySubscription(self, group)
+        with self.lock:
+            self.groups[group].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.groups[subscription.group].discard(subscription)
+            if not self.groups[subscription.group]:
+                del self.groups[subscription.group]
+
+
+class RedisSubscription:
+    def __init__(self, url, channel):
+        self.url = url
+        self.channel = channel
+        self.client = None
+        self.pubsub = None
+
+    async def open(self):
+        if self.pubsub is None:
+            self.client = redis.asyncio.Redis.from_url(self.url)
+            self.pubsub = self.client.pubsub()
+            await self.pubsub.subscribe(self.channel)
+
+    async def get(self, timeout=None):
+        await self.open()
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        return message["data"].decode() if message else None
+
+    async def close(self):
+        if self.pubsub is not None:
+            await self.pubsub.reset()
+            await self.client.connection_pool.disconnect()
+
+
+class RedisChannelLayer:
+    """Redis PUBLISH/SUBSCRIBE, every ASGI worker receives the events published by any process."""
+
+    def __init__(self, url, prefix="events"):
+        self.url = url
+        self.prefix = prefix
+        self.client = None
+
+    def get_channel(self, group):
+        return f"{self.prefix}:{group}"
+
+    def publish(self, group, message):
+        if self.client is None:
+            self.client = redis.Redis.from_url(self.url)
+        self.client.publish(self.get_channel(group), message)
+
+    def subscribe(self, group):
+        return RedisSubscription(self.url, self.get_channel(group))
+
+
+def get_channel_layer():
+    global _channel_layer
+    if _channel_layer is None:
+        config = settings.EVENTS_CHANNEL_LAYER
+        _channel_layer = import_string(config["BACKEND"])(**config.get("CONFIG", {}))
+    return _channel_layer
+
+
+@receiver(setting_changed)
+def reset_channel_layer(setting, **kwargs):
+    global _channel_layer
+    if setting == "EVENTS_CHANNEL_LAYER":
+        _channel_layer = None
+
+
+def issue_stream_ticket(user_id):
+    """
+    A random ticket that opens one event stream of ``user_id`` within EVENTS_TICKET_TTL seconds.
+    EventSource cannot send headers, the ticket goes into the URL instead of the JWT, so access
+    logs and proxies only ever see a spent or expiring ticket.
+    """
+    ticket = secrets.token_urlsafe(32)
+    cache.set(f"events:ticket:{ticket}", user_id, settings.EVENTS_TICKET_TTL)
+    return ticket
+
+
+def redeem_stream_ticket(ticket):
+    """The user id of an unused ``ticket``, or None. Only the first of concurrent redemptions succeeds."""
+    key = f"events:ticket:{ticket}"
+    user_id = cache.get(key)
+    if user_id is None or not cache.delete(key):
+        return None
+    return user_id
+
+
+def get_user_group(user_id):
+    return f"user:{user_id}"
+
+
+def publish_event(user_ids, event_type, data):
+    """
+    Push ``{"type": event_type, "data": data}`` to the event streams of ``user_ids`` once the
+    current transaction commits, so clients never fetch a state older than the event. A failing
+    channel layer is logged and does not affect the request.
+    """
+    user_ids = set(user_ids) - {None}
+    if not user_ids:
+        return
+    message = json.dumps({"type": event_type, "data": data}, cls=JSONEncoder)
+
+    def publish():
+        layer = get_channel_layer()
+        for user_id in user_ids:
+            try:
+                layer.publish(get_user_group(user_id), message)
+            except Exception:
+                logger.exception("Could not publish %s to user %s", event_type, user_id)
+
+    transaction.on_commit(publish)
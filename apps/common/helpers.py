@@ -1,8 +1,8 @@
 from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework.permissions import AllowAny
-from django.core.mail import send_mail
-from django.conf import settings
+
+from apps.common.models import OutboxEmail
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -16,7 +16,20 @@ schema_view = get_schema_view(
 
 
 def send_notification(recipients, subject, message):
-    from_email = settings.EMAIL_HOST_USER
-    if not isinstance(recipients, (list, tuple)):
-        recipients = [recipients]
-    send_mail(subject, message, from_email, recipients, fail_silently=True)
+    """
+    Queue an email in the outbox. Call it inside the transaction that makes the change,
+    the `send_notifications` worker delivers it after commit.
+    """
+    send_notifications([(recipients, subject, message)])
+
+
+def send_notifications(notifications):
+    """Queue several ``(recipients, subject, message)`` notifications with one INSERT."""
+    emails = []
+    for recipients, subject, message in notifications:
+        if not isinstance(recipients, (list, tuple)):
+            recipients = [recipients]
+        emails += [
+            OutboxEmail(recipient=recipient, subject=subject, message=message) for recipient in recipients if recipient
+        ]
+    OutboxEmail.objects.bulk_create(emails)
@@ -0,0 +1,55 @@
+import statistics
+import time
+from multiprocessing import Pool
+
+import requests
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+def run_client(url, headers, duration):
+    """One client process: request ``url`` back to back for ``duration`` seconds."""
+    latencies, errors = [], 0
+    session = requests.Session()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = session.get(url, headers=headers, timeout=30)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        latencies.append((time.perf_counter() - started) * 1000)
+        errors += not ok
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    help = 'Measures the throughput of a running server at increasing client concurrency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://web:8000/common/protected')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32],
+                            help='Numbers of client processes to run, one level after the other')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds to run every level')
+        parser.add_argument('--user', help='Authenticate as this user, created if missing')
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['user']:
+            user, _ = User.objects.get_or_create(username=options['user'], defaults={'email': options['user']})
+            headers['Authorization'] = f"Bearer {RefreshToken.for_user(user).access_token}"
+
+        self.stdout.write(f"{'clients':>8} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} "
+                          f"{'p95 ms':>8} {'p99 ms':>8}")
+        for concurrency in options['concurrency']:
+            with Pool(concurrency) as pool:
+                results = pool.starmap(run_client, [(options['url'], headers, options['duration'])] * concurrency)
+            latencies = [latency for client_latencies, _ in results for latency in client_latencies]
+            errors = sum(client_errors for _, client_errors in results)
+            cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else [0] * 99
+            self.stdout.write(
+                f"{concurrency:>8} {len(latencies):>9} {errors:>7} {len(latencies) / options['duration']:>9.1f} "
+                f"{cuts[49]:>8.2f} {cuts[94]:>8.2f} {cuts[98]:>8.2f}"
+            )
@@ -0,0 +1,130 @@
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+
+_current_metrics = ContextVar("request_metrics", default=None)
+
+_string_literal = re.compile(r"'(?:[^']|'')*'")
+_number = re.compile(r"\b\d+(?:\.\d+)?\b")
+_placeholder_list = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+_whitespace = re.compile(r"\s+")
+
+
+def query_fingerprint(sql):
+    """Normalize ``sql`` so queries that only differ in their values share a fingerprint."""
+    sql = _string_literal.sub("?", sql)
+    sql = _number.sub("?", sql)
+    sql = _placeholder_list.sub("(...)", sql)
+    return _whitespace.sub(" ", sql).strip()
+
+
+class RequestMetrics:
+    """Counters of one request, filled by the database wrapper, the cache backends and the views."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total_time = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.fingerprints = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.serializer_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed with connection.execute_wrapper(), sees every query of the request.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.fingerprints[query_fingerprint(sql)] += 1
+
+    def finish(self):
+        self.total_time = time.perf_counter() - self.started
+
+    def duplicate_queries(self):
+        return {fingerprint: count for fingerprint, count in self.fingerprints.most_common() if count > 1}
+
+    def as_dict(self):
+        return {
+            "queries": self.queries,
+            "db_ms": round(self.db_time * 1000, 3),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "serializer_ms": round(self.serializer_time * 1000, 3),
+            "total_ms": round(self.total_time * 1000, 3),
+        }
+
+    def server_timing(self):
+        return ", ".join([
+            f'db;dur={self.db_time * 1000:.3f};desc="{self.queries} queries"',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f"serializer;dur={self.serializer_time * 1000:.3f}",
+            f"total;dur={self.total_time * 1000:.3f}",
+        ])
+
+
+@contextmanager
+def track_queries(metrics):
+    """Count the queries of the current thread's connections into ``metrics``, if there are any."""
+    with ExitStack() as stack:
+        if metrics is not None:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+        yield
+
+
+@contextmanager
+def collect_metrics():
+    """Collect the metrics of everything running inside the block, on every database connection."""
+    metrics = RequestMetrics()
+    token = _current_metrics.set(metrics)
+    try:
+        with track_queries(metrics):
+            yield metrics
+    finally:
+        metrics.finish()
+        _current_metrics.reset(token)
+
+
+def current_metrics():
+    return _current_metrics.get()
+
+
+def record_cache_access(hits=0, misses=0):
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+def record_serializer_time(seconds):
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.serializer_time += seconds
+
+
+class SerializerTimingMixin:
+    """Adds the time spent in ``serializer.data`` of the view's serializers to the request metrics."""
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if current_metrics() is None:
+            return serializer
+        to_representation = serializer.to_representation
+
+        def timed_to_representation(instance):
+            started = time.perf_counter()
+            try:
+                return to_representation(instance)
+            finally:
+                record_serializer_time(time.perf_counter() - started)
+
+        serializer.to_representation = timed_to_representation
+        return serializer
@@ -1,12 +1,17 @@
+import json
 import logging
 import traceback
 
+from django.conf import settings
 from django.http import JsonResponse
 from django.utils import translation
 from django.utils.deprecation import MiddlewareMixin
 from django.utils.translation import gettext as _
 
+from apps.common.metrics import collect_metrics
+
 logger = logging.getLogger(__name__)
+performance_logger = logging.getLogger("apps.performance")
 
 
 # Create your middleware here.
@@ -28,3 +33,29 @@ class ApiMiddleware(MiddlewareMixin):
             },
             status=500,
         )
+
+
+class PerformanceMiddleware:
+    """
+    Measures SQL, cache, serializer and total time of every request. The numbers are sent in the
+    ``Server-Timing`` header and logged as one JSON line, slow or query heavy requests also log
+    their repeated query fingerprints.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with collect_metrics() as metrics:
+            response = self.get_response(request)
+        response["Server-Timing"] = metrics.server_timing()
+
+        record = {"method": request.method, "path": request.path, "status": response.status_code,
+                  **metrics.as_dict()}
+        if (metrics.queries > settings.PERFORMANCE_MAX_QUERIES
+                or metrics.total_time * 1000 > settings.PERFORMANCE_SLOW_REQUEST_MS):
+            record["duplicate_queries"] = metrics.duplicate_queries()
+            performance_logger.warning(json.dumps(record), extra={"performance": record})
+        else:
+            performance_logger.info(json.dumps(record), extra={"performance": record})
+        return response
@@ -0,0 +1,92 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from apps.common.models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+def claim_batch(batch_size):
+    """
+    Lock a batch of due messages and push their next attempt past the lease, so a
+    concurrent worker skips them and a crashed worker's batch is picked up again later.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.Status.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        OutboxEmail.objects.filter(pk__in=[item.pk for item in batch]).update(
+            next_attempt_at=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+        )
+    return batch
+
+
+def build_email(recipient, items, connection):
+    if len(items) == 1:
+        subject, message = items[0].subject, items[0].message
+    else:
+        subject = f"You have {len(items)} new notifications"
+        message = "\n\n".join(f"{item.subject}\n{item.message}" for item in items)
+    return EmailMessage(subject, message, settings.EMAIL_HOST_USER, [recipient], connection=connection)
+
+
+def mark_failed(items, error):
+    now = timezone.now()
+    for item in items:
+        item.attempts += 1
+        item.last_error = str(error)
+        if item.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            item.status = OutboxEmail.Status.FAILED
+        else:
+            delay = settings.OUTBOX_RETRY_DELAY * 2 ** (item.attempts - 1)
+            item.next_attempt_at = now + timedelta(seconds=delay)
+    OutboxEmail.objects.bulk_update(items, ["attempts", "last_error", "status", "next_attempt_at"])
+
+
+def deliver_batch(batch_size=None):
+    """
+    Send one batch of pending messages over a single SMTP connection. Messages to the
+    same recipient are coalesced into one digest. Returns ``(sent, failed)`` row counts.
+    """
+    batch = claim_batch(batch_size or settings.OUTBOX_BATCH_SIZE)
+    if not batch:
+        return 0, 0
+
+    by_recipient = defaultdict(list)
+    for item in batch:
+        by_recipient[item.recipient].append(item)
+
+    sent, failed = [], []
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        logger.warning("Could not open mail connection: %s", error)
+        mark_failed(batch, error)
+        return 0, len(batch)
+    try:
+        for recipient, items in by_recipient.items():
+            try:
+                build_email(recipient, items, connection).send()
+            except Exception as error:
+                logger.warning("Could not deliver %s notifications to %s: %s", len(items), recipient, error)
+                mark_failed(items, error)
+                failed.extend(items)
+            else:
+                sent.extend(items)
+    finally:
+        connection.close()
+
+    OutboxEmail.objects.filter(pk__in=[item.pk for item in sent]).update(
+        status=OutboxEmail.Status.SENT, sent_at=timezone.now()
+    )
+    return len(sent), len(failed)
@@ -0,0 +1,71 @@
+from rest_framework.compat import coreapi, coreschema
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+# Create your paginations here.
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination: filters on the ordering column instead of using OFFSET
+    and never runs a COUNT query, so every page costs the same as the first one.
+
+    The ordering is taken from the view's ``get_keyset_ordering()`` or ``ordering``
+    attribute and falls back to ``id``.
+    """
+
+    ordering = "id"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        if hasattr(view, "get_keyset_ordering"):
+            ordering = view.get_keyset_ordering()
+        else:
+            ordering = getattr(view, "ordering", None) or self.ordering
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+
+class OptionalKeysetPagination(PageNumberPagination):
+    """
+    Page number pagination unless the client opts in to keyset pagination with
+    ``?pagination=cursor`` (or follows a link that carries a ``cursor``).
+    """
+
+    mode_query_param = "pagination"
+    keyset_class = KeysetPagination
+
+    keyset = None
+
+    def use_keyset(self, request):
+        params = request.query_params
+        return params.get(self.mode_query_param) == "cursor" or self.keyset_class.cursor_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_fields(self, view):
+        return super().get_schema_fields(view) + [
+            coreapi.Field(
+                name=self.mode_query_param,
+                required=False,
+                location="query",
+                schema=coreschema.Enum(enum=["cursor"], description="Set to `cursor` for keyset pagination."),
+            ),
+            coreapi.Field(
+                name=self.keyset_class.cursor_query_param,
+                required=False,
+                location="query",
+                schema=coreschema.String(description=str(self.keyset_class.cursor_query_description)),
+            ),
+        ]
@@ -1,7 +1,38 @@
+import asyncio
+import json
+import uuid
+from decimal import Decimal
+from io import BytesIO, StringIO
+from smtplib import SMTPException
+from unittest import mock
+
+
+from asgiref.sync import async_to_sync
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.reverse import reverse
+from rest_framework.utils.serializer_helpers import ReturnList
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.common.asgi import EventStreamApplication, PathRouter
+from apps.common.authentication import user_cache
+from apps.common.cache import AggregateCache
+from apps.common.events import get_channel_layer, get_user_group
+from apps.common.helpers import send_notification
+from apps.common.metrics import collect_metrics, query_fingerprint
+from apps.common.models import OutboxEmail
+from apps.common.outbox import deliver_batch
+from apps.common.parsers import ORJSONParser
+from apps.common.permissions import ReadOnly
+from apps.common.renderers import ORJSONRenderer
+from apps.common.signals import close_broken_connections
 
 
 # Create your tests here.
@@ -22,3 +53,351 @@ class TestCommon(TestCase):
         self.client.force_authenticate(user=self.test_user1)
         response = self.client.get(reverse("protected_view"))
         self.assertEqual(response.status_code, 200)
+
+
+class TestNotificationOutbox(TestCase):
+    def test_send_notification_only_queues(self):
+        send_notification(["user1@email.com", "user2@email.com"], "New task!", "New task was assigned to You")
+        self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.Status.PENDING).count(), 2)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_worker_delivers_and_coalesces_per_recipient(self):
+        send_notification("user1@email.com", "New task!", "New task was assigned to You")
+        send_notification("user1@email.com", "New comment!", "You task was commented")
+        send_notification("user2@email.com", "New task!", "New task was assigned to You")
+
+        call_command("send_notifications", "--once", stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 2)
+        digest = next(message for message in mail.outbox if message.to == ["user1@email.com"])
+        self.assertEqual(digest.subject, "You have 2 new notifications")
+        self.assertIn("You task was commented", digest.body)
+        self.assertFalse(OutboxEmail.objects.exclude(status=OutboxEmail.Status.SENT).exists())
+
+    def test_worker_retries_with_backoff(self):
+        send_notification("user1@email.com", "New task!", "New task was assigned to You")
+        with mock.patch("apps.common.outbox.EmailMessage.send", side_effect=SMTPException("unavailable")):
+            sent, failed = deliver_batch()
+        self.assertEqual((sent, failed), (0, 1))
+        message = OutboxEmail.objects.get()
+        self.assertEqual(message.status, OutboxEmail.Status.PENDING)
+        self.assertEqual(message.attempts, 1)
+        self.assertGreater(message.next_attempt_at, timezone.now())
+        self.assertEqual(deliver_batch(), (0, 0))
+
+
+@override_settings(CACHES={"default": {"BACKEND": "apps.common.cache.InstrumentedLocMemCache"}})
+class TestPerformanceMiddleware(TestCase):
+    fixtures = ["users"]
+
+    def test_server_timing_header_and_log_line(self):
+        with self.assertLogs("apps.performance", level="INFO") as logs:
+            response = self.client.get(reverse("user-list"))
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn("serializer;dur=", response["Server-Timing"])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record["path"], record["status"]), (reverse("user-list"), 200))
+        self.assertGreater(record["queries"], 0)
+        self.assertGreater(record["serializer_ms"], 0)
+        self.assertNotIn("duplicate_queries", record)
+
+    @override_settings(PERFORMANCE_MAX_QUERIES=0)
+    def test_query_heavy_requests_log_duplicate_fingerprints(self):
+        with self.assertLogs("apps.performance", level="WARNING") as logs:
+            self.client.get(reverse("user-list"))
+        self.assertIn("duplicate_queries", logs.records[0].performance)
+
+    def test_metrics_count_cache_and_repeated_queries(self):
+        cache.set("present", 1)
+        with collect_metrics() as metrics:
+            cache.get("present")
+            cache.get("absent")
+            User.objects.filter(pk=1).exists()
+            User.objects.filter(pk=2).exists()
+        self.assertEqual((metrics.cache_hits, metrics.cache_misses), (1, 1))
+        self.assertEqual(list(metrics.duplicate_queries().values()), [2])
+
+    def test_query_fingerprint_ignores_values(self):
+        self.assertEqual(
+            query_fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            query_fingerprint("SELECT * FROM t WHERE id IN (%s, %s)   AND name = 'y' LIMIT 1"),
+        )
+
+    def test_cache_stats_view_is_admin_only(self):
+        client = APIClient()
+        user = User.objects.get(email="user1@email.com")
+        client.force_authenticate(user=user)
+        self.assertEqual(client.get(reverse("cache_stats_view")).status_code, 403)
+        user.is_staff = True
+        response = client.get(reverse("cache_stats_view"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("task-detail", response.json())
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class TestAggregateCache(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.aggregate = AggregateCache("test-aggregate", ttl=60, stale_ttl=60, lock_timeout=1)
+        self.aggregate.lock_poll_interval = 0.01
+
+    def test_waits_for_the_worker_holding_the_lock(self):
+        generation = self.aggregate.generations.get(1)
+        cache.add(self.aggregate.get_lock_key(1), 1)
+        cache.set(self.aggregate.get_entry_key(1), {"value": "computed", "generation": generation, "fresh_until": 0})
+        self.assertEqual(self.aggregate.get(1, lambda: "recomputed"), "computed")
+
+        cache.delete(self.aggregate.get_entry_key(1))
+        with mock.patch("apps.common.cache.time.sleep") as sleep:
+            sleep.side_effect = lambda seconds: cache.set(
+                self.aggregate.get_entry_key(1),
+                {"value": "from other worker", "generation": generation, "fresh_until": 0})
+            self.assertEqual(self.aggregate.get(1, lambda: "recomputed"), "from other worker")
+
+    def test_entries_of_older_generations_are_not_served_while_locked(self):
+        self.assertEqual(self.aggregate.get(1, lambda: "first"), "first")
+        self.aggregate.invalidate([1])
+        cache.add(self.aggregate.get_lock_key(1), 1)
+        with mock.patch("apps.common.cache.time.sleep") as sleep:
+            sleep.side_effect = lambda seconds: cache.set(self.aggregate.get_entry_key(1), {
+                "value": "from other worker", "generation": self.aggregate.generations.get(1), "fresh_until": 0})
+            self.assertEqual(self.aggregate.get(1, lambda: "second"), "from other worker")
+
+    def test_lock_of_another_worker_is_kept(self):
+        lock_key = self.aggregate.get_lock_key(1)
+
+        def compute():
+            # Our lock timed out and another worker took it over.
+            cache.set(lock_key, "other")
+            return "computed"
+
+        self.assertEqual(self.aggregate.get(1, compute), "computed")
+        self.assertEqual(cache.get(lock_key), "other")
+        cache.delete(lock_key)
+        self.assertEqual(self.aggregate.get(2, lambda: "computed"), "computed")
+        self.assertIsNone(cache.get(self.aggregate.get_lock_key(2)))
+
+    def test_evicted_generation_expires_entries(self):
+        self.assertEqual(self.aggregate.get(1, lambda: "first"), "first")
+        cache.delete(self.aggregate.generations.get_key(1))
+        self.assertEqual(self.aggregate.get(1, lambda: "second"), "second")
+
+    def test_invalidate_expires_entries_of_older_generations(self):
+        self.assertEqual(self.aggregate.get(1, lambda: "first"), "first")
+        self.assertEqual(self.aggregate.get(1, lambda: "second"), "first")
+        self.aggregate.invalidate([1])
+        self.assertEqual(self.aggregate.get(1, lambda: "second"), "second")
+        self.assertEqual(self.aggregate.get(2, lambda: "other"), "other")
+
+
+class TestCachedJWTAuthentication(TestCase):
+    fixtures = ["users"]
+
+    def setUp(self):
+        cache.clear()
+        user_cache.local.clear()
+        self.client = APIClient()
+        self.user = User.objects.get(email="user1@email.com")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+    def test_user_is_resolved_without_queries(self):
+        self.assertEqual(self.client.get(reverse("protected_view")).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse("protected_view")).status_code, 200)
+
+        user_cache.local.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse("protected_view")).status_code, 200)
+
+    def test_deactivated_and_deleted_users_are_rejected(self):
+        self.client.get(reverse("protected_view"))
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse("protected_view"))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data["code"], "user_inactive")
+
+        self.user.delete()
+        response = self.client.get(reverse("protected_view"))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data["code"], "user_not_found")
+
+    def test_user_changes_refresh_cached_user(self):
+        self.client.get(reverse("protected_view"))
+        self.user.is_staff = True
+        self.user.save()
+        self.assertTrue(user_cache.get(self.user.pk).is_staff)
+
+    def test_password_hash_is_not_cached(self):
+        self.user.set_password("password")
+        self.user.save()
+        self.client.get(reverse("protected_view"))
+        cached = cache.get(user_cache.get_key(self.user.pk))
+        self.assertNotIn("password", cached)
+        self.assertNotIn(self.user.password, str(cached))
+        user = user_cache.get(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual((user.pk, user.email), (self.user.pk, self.user.email))
+        self.assertIn("password", user.get_deferred_fields())
+
+    def test_cached_user_loads_and_saves_the_real_row(self):
+        self.user.set_password("password")
+        self.user.save()
+        user = user_cache.get(self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.date_joined, self.user.date_joined)
+        user.first_name = "Renamed"
+        user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, "Renamed")
+        self.assertTrue(self.user.check_password("password"))
+        self.assertTrue(user_cache.get(self.user.pk).check_password("password"))
+
+
+class TestConnectionHealthCheck(TestCase):
+    def test_broken_connections_are_closed_before_the_request(self):
+        connection = mock.Mock(connection=object(), in_atomic_block=False)
+        connection.is_usable.return_value = False
+        with mock.patch("apps.common.signals.connections.all", return_value=[connection]):
+            close_broken_connections()
+        connection.close.assert_called_once_with()
+
+        connection.reset_mock()
+        connection.is_usable.return_value = True
+        with mock.patch("apps.common.signals.connections.all", return_value=[connection]):
+            close_broken_connections()
+        connection.close.assert_not_called()
+
+
+class TestORJSONRenderer(TestCase):
+    def test_output_matches_json_renderer(self):
+        data = {
+            "created": timezone.now(),
+            "day": timezone.localdate(),
+            "amount": Decimal("1.50"),
+            "message": ReadOnly.message,
+            "id": uuid.uuid4(),
+            1: "Задача \u2028",
+            "results": ReturnList([{"id": 1}, None], serializer=None),
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indented_output_uses_json_renderer(self):
+        data = {"results": [1, 2]}
+        self.assertEqual(ORJSONRenderer().render(data, "application/json; indent=4"),
+                         JSONRenderer().render(data, "application/json; indent=4"))
+
+    def test_parser(self):
+        self.assertEqual(ORJSONParser().parse(BytesIO('{"title": "Задача"}'.encode())), {"title": "Задача"})
+        self.assertEqual(ORJSONParser().parse(BytesIO('[1]'.encode("utf-16")), parser_context={"encoding": "utf-16"}),
+                         [1])
+        for body in [b"{", b"[NaN]"]:
+            with self.assertRaises(ParseError):
+                ORJSONParser().parse(BytesIO(body))
+
+    def test_browsable_api_and_schema(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="user@example.com", password="password"))
+        response = client.get(reverse("task-list"), HTTP_ACCEPT="text/html")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"<html", response.content)
+        response = client.get(reverse("schema-swagger-ui"), {"format": "openapi"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("/tasks/dashboard", response.json()["paths"])
+        response = client.post(reverse("task-list"), '{"title": "t", "description": "d"}',
+                               content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response["Content-Type"], "application/json")
+
+
+@override_settings(EVENTS_CHANNEL_LAYER={"BACKEND": "apps.common.events.InMemoryChannelLayer"})
+class TestEventStream(TestCase):
+    fixtures = ["users"]
+
+    def setUp(self):
+        cache.clear()
+        user_cache.local.clear()
+        self.user = User.objects.get(email="user1@email.com")
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def get_scope(self, headers=(), query_string=b"", method="GET"):
+        return {"type": "http", "method": method, "path": "/events", "headers": list(headers),
+                "query_string": query_string}
+
+    def stream(self, scope, events=()):
+        """
+        Messages sent by the application. ``events`` are published once connected, the client disconnects
+        after receiving them, or after the first keepalive without events.
+        """
+        sent = []
+
+        async def run():
+            disconnected = asyncio.Event()
+            pending = list(events)
+
+            async def receive():
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                sent.append(message)
+                if message["type"] != "http.response.body":
+                    return
+                if message["body"] == b": connected\n\n":
+                    for event in pending:
+                        get_channel_layer().publish(get_user_group(self.user.pk), event)
+                    return
+                if message["body"].startswith(b"data: "):
+                    pending.pop(0)
+                if not pending:
+                    disconnected.set()
+
+            await asyncio.wait_for(EventStreamApplication()(scope, receive, send), 5)
+
+        async_to_sync(run)()
+        return sent
+
+    def test_events_are_streamed(self):
+        sent = self.stream(self.get_scope([(b"authorization", f"Bearer {self.token}".encode())]),
+                           ['{"type": "task.assigned"}', '{"type": "task.completed"}'])
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertIn((b"content-type", b"text/event-stream"), sent[0]["headers"])
+        self.assertEqual([message["body"] for message in sent[1:]], [
+            b": connected\n\n", b'data: {"type": "task.assigned"}\n\n', b'data: {"type": "task.completed"}\n\n',
+        ])
+        # The subscription is closed with the stream.
+        self.assertEqual(get_channel_layer().groups, {})
+
+    @override_settings(EVENTS_KEEPALIVE_SECONDS=0)
+    def test_ticket_and_keepalive(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        ticket = client.post(reverse("events_ticket_view")).data["ticket"]
+        sent = self.stream(self.get_scope(query_string=f"ticket={ticket}".encode()))
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertEqual(sent[-1]["body"], b": keepalive\n\n")
+
+        # Tickets are single-use, JWTs are not accepted in the query string.
+        for query_string in [f"ticket={ticket}", f"token={self.token}"]:
+            self.assertEqual(self.stream(self.get_scope(query_string=query_string.encode()))[0]["status"], 401)
+
+    def test_unauthenticated_requests_are_rejected(self):
+        for headers, query_string in [((), b""), ([(b"authorization", b"Bearer invalid")], b""), ((), b"ticket=x")]:
+            sent = self.stream(self.get_scope(headers, query_string))
+            self.assertEqual(sent[0]["status"], 401)
+            self.assertEqual(len(sent), 2)
+        self.assertEqual(self.stream(self.get_scope(method="POST"))[0]["status"], 405)
+
+    def test_path_router(self):
+        calls = []
+
+        def application(name):
+            async def call(scope, receive, send):
+                calls.append((name, scope["path"]))
+            return call
+
+        router = PathRouter({"/events": application("events")}, application("django"))
+        for path in ["/events", "/events/", "/eventsource", "/tasks"]:
+            async_to_sync(router)({"type": "http", "path": path}, None, None)
+        self.assertEqual(calls, [("events", "/events"), ("events", "/events/"), ("django", "/eventsource"),
+                                 ("django", "/tasks")])
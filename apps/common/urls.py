@@ -1,8 +1,10 @@
 from django.urls import path
 
-from apps.common.views import HealthView, ProtectedTestView
+from apps.common.views import CacheStatsView, EventTicketView, HealthView, ProtectedTestView
 
 urlpatterns = [
     path("health", HealthView.as_view(), name="health_view"),
     path("protected", ProtectedTestView.as_view(), name="protected_view"),
+    path("cache-stats", CacheStatsView.as_view(), name="cache_stats_view"),
+    path("events/ticket", EventTicketView.as_view(), name="events_ticket_view"),
 ]
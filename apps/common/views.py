@@ -1,11 +1,47 @@
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
 from rest_framework.generics import GenericAPIView
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 
+from apps.common.cache import cache_stats
+from apps.common.events import issue_stream_ticket
+
 
 # Create your views here.
 
 
+class ConditionalListMixin:
+    """
+    ETag / If-None-Match for list actions. ``get_list_version()`` returns a cheap version of the
+    listed data, usually a ChangeCounter value, or None to skip. An unchanged version answers 304
+    before the queryset is built. Versions are per user scope and can coincide between users, so
+    the ETag includes the user and responses are private to the credentials.
+    """
+
+    def get_list_version(self):
+        return None
+
+    def get_list_etag(self, version):
+        request = self.request
+        key = f"{request.user.pk}:{self.action}:{version}:{request.accepted_media_type}:{request.get_full_path()}"
+        return quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+    def list(self, request, *args, **kwargs):
+        version = self.get_list_version()
+        if version is None:
+            return super().list(request, *args, **kwargs)
+        etag = self.get_list_etag(version)
+        response = get_conditional_response(request, etag=etag) or super().list(request, *args, **kwargs)
+        response["ETag"] = etag
+        patch_cache_control(response, private=True)
+        patch_vary_headers(response, ("Authorization",))
+        return response
+
+
 class HealthView(GenericAPIView):
     authentication_classes = ()
     permission_classes = (AllowAny,)
@@ -25,3 +61,17 @@ class ProtectedTestView(GenericAPIView):
                 "live": True,
             }
         )
+
+
+class EventTicketView(GenericAPIView):
+    """A single-use ticket for ``/events?ticket=...``, valid for EVENTS_TICKET_TTL seconds."""
+
+    def post(self, request):
+        return Response({"ticket": issue_stream_ticket(request.user.pk), "expires_in": settings.EVENTS_TICKET_TTL})
+
+
+class CacheStatsView(GenericAPIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(cache_stats())
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class TasksConfig(AppConfig):
+    name = "apps.tasks"
+
+    def ready(self):
+        from apps.tasks import signals  # noqa: F401
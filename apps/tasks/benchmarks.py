@@ -0,0 +1,216 @@
+import random
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from apps.common.serializers import get_values_serializer
+from apps.tasks.models import Comment, Task, TimeLog
+from apps.tasks.random_data import build_spec, ensure_users, load_random_data
+from apps.tasks.serializers import AllCommentSerializer, TaskListSerializer, TimeLogSerializer
+
+SEED_BATCH_SIZE = 5000
+SERIALIZER_BENCHMARK_SIZES = (100, 1000, 10000)
+BENCHMARK_METRICS = ("p50", "p95", "p99", "peak_memory_kb")
+
+# Requests go through the real URLconf but never reach the shared cache, so every
+# sample measures the database path.
+BENCHMARK_SETTINGS = {
+    "ALLOWED_HOSTS": ["testserver"],
+    "CACHES": {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+}
+
+
+@contextmanager
+def isolated_database(keepdb=False):
+    """Create a throwaway test database so seeding never touches real data."""
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        with override_settings(**BENCHMARK_SETTINGS):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+
+
+def seed_time_logs(owner, tasks, logs, days, seed=0):
+    """Create ``tasks`` tasks owned by ``owner`` and spread ``logs`` time logs over the last ``days`` days."""
+    rng = random.Random(seed)
+    task_ids = []
+    for start in range(0, tasks, SEED_BATCH_SIZE):
+        batch = [
+            Task(title=f"Task {i}", description=f"Task {i}", user=owner, owner=owner)
+            for i in range(start, min(start + SEED_BATCH_SIZE, tasks))
+        ]
+        task_ids += [task.pk for task in Task.objects.bulk_create(batch)]
+    if None in task_ids:
+        task_ids = list(Task.objects.filter(owner=owner).values_list("pk", flat=True))
+
+    now = timezone.now()
+    for start in range(0, logs, SEED_BATCH_SIZE):
+        batch = []
+        for _ in range(min(SEED_BATCH_SIZE, logs - start)):
+            start_time = now - timedelta(minutes=rng.randint(0, days * 24 * 60))
+            duration = rng.randint(1, 600)
+            batch.append(TimeLog(task_id=rng.choice(task_ids), user=owner, start_time=start_time,
+                                 end_time=start_time + timedelta(minutes=duration), duration=duration))
+        TimeLog.objects.bulk_create(batch)
+
+
+def seed_dataset(tasks, users=50, logs_per_task=2, comments_per_task=1, days=30, seed=0):
+    """
+    Create ``users`` users and ``tasks`` tasks with their time logs and comments, spread
+    randomly over the users. Returns the first user, which is the one the benchmarks log in as.
+    """
+    user_ids = ensure_users(users)
+    spec = build_spec(tasks, user_ids, logs_per_task=logs_per_task, comments_per_task=comments_per_task, days=days,
+                      seed=seed)
+    for _ in load_random_data(spec):
+        pass
+    call_command("rebuild_rollups", stdout=StringIO())
+    return User.objects.get(pk=user_ids[0])
+
+
+def measure(user, url, runs, method="get", data=None, setup=None):
+    """
+    Request ``url`` ``runs`` times as ``user`` and return latency percentiles, the query count
+    and the peak memory allocated by one extra request. ``setup`` runs untimed before each request.
+    """
+    client = APIClient()
+    client.force_authenticate(user=user)
+    extra = {} if method == "get" else {"format": "json"}
+
+    def request():
+        response = getattr(client, method)(url, data, **extra)
+        assert 200 <= response.status_code < 300, response.content
+        return response
+
+    samples = []
+    for _ in range(runs):
+        if setup:
+            setup()
+        # The query log is a bounded deque, once full it no longer grows and nothing would be captured.
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            request()
+            samples.append((time.perf_counter() - started) * 1000)
+        query_count = len(queries)
+
+    # tracemalloc slows allocations down, so memory is measured apart from the timed runs.
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        request()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"queries": query_count, **percentiles(samples), "peak_memory_kb": round(peak / 1024, 1)}
+
+
+def percentiles(samples):
+    if len(samples) < 2:
+        samples = samples * 2
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": round(cuts[49], 3), "p95": round(cuts[94], 3), "p99": round(cuts[98], 3)}
+
+
+def get_benchmark_user(username="benchmark@example.com"):
+    """The benchmark user, created on the first run and found again in a kept database."""
+    user = User.objects.filter(username=username).first()
+    return user or User.objects.create_user(username=username, email=username, password=None)
+
+
+def endpoint_benchmarks(user):
+    """The measured actions as ``(name, method, url, data, setup)``, run against ``user``'s data."""
+    task = Task.objects.filter(owner=user).order_by("pk").first()
+
+    def start_timer():
+        TimeLog.objects.create(task=task, user=user, start_time=timezone.now() - timedelta(minutes=30))
+
+    return [
+        ("list", "get", reverse("task-list"), None, None),
+        ("retrieve", "get", reverse("task-detail", args=[task.pk]), None, None),
+        ("my", "get", reverse("task-my"), None, None),
+        ("created", "get", reverse("task-created"), None, None),
+        ("completed", "get", reverse("task-completed"), None, None),
+        ("top", "get", reverse("task-top"), None, None),
+        ("comments", "get", reverse("task-comments", args=[task.pk]), None, None),
+        ("time_logs", "get", reverse("task-time-logs", args=[task.pk]), None, None),
+        ("stop", "post", reverse("timer-stop"), {"task": task.pk}, start_timer),
+        ("time_logged_last_month", "get", reverse("timer-get-time-logged-last-month"), None, None),
+    ]
+
+
+def run_endpoint_benchmarks(user, runs):
+    return {
+        name: measure(user, url, runs, method=method, data=data, setup=setup)
+        for name, method, url, data, setup in endpoint_benchmarks(user)
+    }
+
+
+def compare_reports(report, baseline, tolerance=0.2):
+    """
+    Return a message for every action of ``report`` that got slower, heavier or issues more
+    queries than in ``baseline``. Timings and memory may grow by ``tolerance`` before they count.
+    """
+    regressions = []
+    for size, dataset in report["datasets"].items():
+        baseline_actions = baseline.get("datasets", {}).get(size, {}).get("actions", {})
+        for name, result in dataset["actions"].items():
+            previous = baseline_actions.get(name)
+            if previous is None:
+                continue
+            if result["queries"] > previous["queries"]:
+                regressions.append(f"{size} {name}: queries {previous['queries']} -> {result['queries']}")
+            for metric in BENCHMARK_METRICS:
+                if result[metric] > previous[metric] * (1 + tolerance):
+                    regressions.append(f"{size} {name}: {metric} {previous[metric]} -> {result[metric]}")
+    return regressions
+
+
+def serializer_benchmarks():
+    """The list serializers as ``(name, serializer_class, queryset)``."""
+    return [
+        ("tasks", TaskListSerializer, Task.objects.order_by("id")),
+        ("comments", AllCommentSerializer, Comment.objects.order_by("id")),
+        ("time_logs", TimeLogSerializer, TimeLog.objects.order_by("id")),
+    ]
+
+
+def time_runs(function, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000)
+    return percentiles(samples)
+
+
+def run_serializer_benchmarks(sizes=SERIALIZER_BENCHMARK_SIZES, runs=20):
+    """
+    Time fetching and serializing pages of ``sizes`` rows through the DRF serializer and through
+    ValuesSerializer, both include the query. Returns ``{name: {size: {"drf": ..., "values": ...}}}``.
+    """
+    report = {}
+    for name, serializer_class, queryset in serializer_benchmarks():
+        values_serializer = get_values_serializer(serializer_class)
+        report[name] = {}
+        for size in sizes:
+            report[name][size] = {
+                "drf": time_runs(lambda: serializer_class(queryset[:size], many=True).data, runs),
+                "values": time_runs(lambda: values_serializer.render(values_serializer.get_queryset(queryset)[:size]),
+                                    runs),
+            }
+    return report
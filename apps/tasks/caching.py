@@ -0,0 +1,64 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.common.cache import AggregateCache, CacheStats, ChangeCounter
+
+task_detail_stats = CacheStats("task-detail")
+top_tasks_cache = AggregateCache("top-tasks", ttl=settings.TOP_TASKS_CACHE_TTL,
+                                 stale_ttl=settings.TOP_TASKS_CACHE_STALE_TTL)
+# Versions behind the ETags of my-tasks (per owner), comments and time_logs (per task).
+owner_tasks_changes = ChangeCounter("owner-tasks")
+task_comments_changes = ChangeCounter("task-comments")
+task_time_logs_changes = ChangeCounter("task-time-logs")
+
+
+def get_version_key(task_id):
+    return f"task:{task_id}:version"
+
+
+def get_detail_key(task_id, version):
+    return f"task:{task_id}:detail:{version}"
+
+
+def get_cached_task_detail(task_id, build):
+    """
+    Return the cached representation of the task with the integer ``task_id``, calling ``build()``
+    and storing its result on a miss. Nothing is cached when ``build()`` raises, ids of missing
+    tasks leave no keys behind.
+    """
+    version_key = get_version_key(task_id)
+    version = cache.get(version_key)
+    data = cache.get(get_detail_key(task_id, version)) if version is not None else None
+    task_detail_stats.record(hit=data is not None)
+    if data is not None:
+        return data
+
+    data = dict(build())
+    if version is None:
+        version = uuid.uuid4().hex
+        # A version stored meanwhile may come from invalidate_tasks() after our read, keep out of it.
+        if not cache.add(version_key, version, settings.TASK_DETAIL_VERSION_TTL):
+            return data
+    cache.set(get_detail_key(task_id, version), data, settings.TASK_DETAIL_CACHE_TTL)
+    return data
+
+
+def invalidate_tasks(task_ids):
+    """
+    Move the tasks to new versions, entries of the old ones are never read again and expire on
+    their own. The versions change again after commit, a reader that cached the old row between
+    the write and the commit is not served afterwards.
+    """
+    task_ids = list(task_ids)
+    if not task_ids:
+        return
+
+    def bump():
+        versions = {get_version_key(task_id): uuid.uuid4().hex for task_id in task_ids}
+        cache.set_many(versions, settings.TASK_DETAIL_VERSION_TTL)
+
+    bump()
+    transaction.on_commit(bump)
@@ -0,0 +1,59 @@
+import csv
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+EXPORT_CHUNK_SIZE = 2000
+
+TASK_EXPORT_FIELDS = ("id", "title", "description", "status", "user", "owner", "total_duration")
+TIME_LOG_EXPORT_FIELDS = ("id", "task", "user", "start_time", "end_time", "duration")
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+class Echo:
+    """File-like object whose write() returns the value, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(fields, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in row])
+
+
+def _ndjson_lines(fields, rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(fields, row))) + "\n"
+
+
+def stream_rows(queryset, fields, output, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield the export in chunks of ``chunk_size`` rows. Rows are read through
+    ``iterator()`` (a server-side cursor on PostgreSQL), so memory does not grow with
+    the number of rows.
+    """
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    lines = _csv_lines(fields, rows) if output == "csv" else _ndjson_lines(fields, rows)
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def export_response(queryset, fields, output, filename):
+    response = StreamingHttpResponse(stream_rows(queryset, fields, output), content_type=CONTENT_TYPES[output])
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{output}"'
+    return response
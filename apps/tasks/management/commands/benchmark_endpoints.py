@@ -0,0 +1,59 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.tasks.benchmarks import compare_reports, isolated_database, run_endpoint_benchmarks, seed_dataset
+
+
+class Command(BaseCommand):
+    help = 'Seeds throwaway databases of the given sizes and reports query counts, latency and memory per endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, nargs='+', default=[25_000],
+                            help='Dataset sizes to benchmark, e.g. --tasks 25000 250000 2500000')
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--logs-per-task', type=int, default=2)
+        parser.add_argument('--comments-per-task', type=int, default=1)
+        parser.add_argument('--runs', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='benchmark-report.json', help='Where to write the JSON report')
+        parser.add_argument('--baseline', help='Report of a previous run to compare against')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed relative growth of latency and memory before it counts as a regression')
+
+    def handle(self, *args, **options):
+        report = {
+            'vendor': connection.vendor,
+            'runs': options['runs'],
+            'seed': options['seed'],
+            'datasets': {},
+        }
+        for tasks in options['tasks']:
+            with isolated_database():
+                self.stdout.write(f"Seeding {tasks} tasks")
+                user = seed_dataset(tasks, users=options['users'], logs_per_task=options['logs_per_task'],
+                                    comments_per_task=options['comments_per_task'], seed=options['seed'])
+                actions = run_endpoint_benchmarks(user, options['runs'])
+            report['datasets'][str(tasks)] = {
+                'tasks': tasks,
+                'time_logs': tasks * options['logs_per_task'],
+                'comments': tasks * options['comments_per_task'],
+                'actions': actions,
+            }
+            for name, result in actions.items():
+                self.stdout.write(
+                    f"{tasks} {name}: {result['queries']} queries, p50 {result['p50']} ms, p95 {result['p95']} ms, "
+                    f"p99 {result['p99']} ms, peak {result['peak_memory_kb']} KiB"
+                )
+
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+        self.stdout.write(f"Report written to {options['output']}")
+
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                regressions = compare_reports(report, json.load(baseline), options['tolerance'])
+            if regressions:
+                raise CommandError("Regressions against the baseline:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.tasks.benchmarks import SERIALIZER_BENCHMARK_SIZES, isolated_database, run_serializer_benchmarks, \
+    seed_dataset
+from apps.tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Seeds a throwaway database and compares the DRF and values() serialization of list pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=list(SERIALIZER_BENCHMARK_SIZES),
+                            help='Rows per page')
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the benchmark database between runs')
+
+    def handle(self, *args, **options):
+        with isolated_database(keepdb=options['keepdb']):
+            rows, seeded = max(options['sizes']), Task.objects.count()
+            # Seed an empty database only, a kept one must hold the same rows on every run.
+            if not seeded:
+                self.stdout.write(f"Seeding {rows} tasks, comments and time logs")
+                seed_dataset(rows, logs_per_task=1, comments_per_task=1)
+            elif seeded < rows:
+                raise CommandError(f"The kept database holds {seeded} tasks, --sizes needs {rows}. "
+                                   f"Run once without --keepdb to seed it again.")
+            else:
+                self.stdout.write(f"Reusing {seeded} tasks, comments and time logs")
+            report = run_serializer_benchmarks(options['sizes'], options['runs'])
+        for name, results in report.items():
+            for size, result in results.items():
+                drf, values = result['drf']['p50'], result['values']['p50']
+                speedup = drf / values if values else float('inf')
+                self.stdout.write(f"{name} {size} rows: drf p50 {drf} ms, values p50 {values} ms ({speedup:.1f}x)")
@@ -0,0 +1,34 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from rest_framework.reverse import reverse
+
+from apps.tasks.benchmarks import get_benchmark_user, isolated_database, measure, seed_time_logs
+from apps.tasks.models import Task, TimeLog
+
+
+class Command(BaseCommand):
+    help = 'Seeds a throwaway database and reports latency percentiles of the uncached `top` endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1000)
+        parser.add_argument('--logs', type=int, default=1_000_000)
+        parser.add_argument('--days', type=int, default=90, help='Spread time logs over this many past days')
+        parser.add_argument('--runs', type=int, default=200)
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the benchmark database between runs')
+
+    def handle(self, *args, **options):
+        with isolated_database(keepdb=options['keepdb']):
+            user = get_benchmark_user()
+            if Task.objects.filter(owner=user).exists():
+                # A kept database is measured as seeded, not grown by another dataset.
+                self.stdout.write(f"Reusing {Task.objects.filter(owner=user).count()} tasks and "
+                                  f"{TimeLog.objects.filter(user=user).count()} time logs")
+            else:
+                self.stdout.write(f"Seeding {options['tasks']} tasks and {options['logs']} time logs")
+                seed_time_logs(user, options['tasks'], options['logs'], options['days'])
+                call_command('rebuild_rollups', stdout=self.stdout)
+            result = measure(user, reverse('task-top'), options['runs'])
+        self.stdout.write(self.style.SUCCESS(
+            f"top: {result['queries']} queries, p50 {result['p50']} ms, "
+            f"p95 {result['p95']} ms, p99 {result['p99']} ms"
+        ))
@@ -1,45 +1,62 @@
-from django.contrib.auth.models import User
-from django.core.management.base import BaseCommand
-import random
-from django.utils import timezone
-from apps.tasks.models import Task, TimeLog
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from apps.tasks.models import Comment, Task, TaskDailyDuration, TimeLog, Tombstone, UserDailyDuration
+from apps.tasks.random_data import GENERATION_BATCH_SIZE, build_spec, ensure_users, load_random_data
 
 
 class Command(BaseCommand):
-    help = 'Creates random tasks and time logs'
+    help = 'Creates random tasks, time logs and comments in fixed-size batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=25000)
+        parser.add_argument('--logs-per-task', type=int, default=2)
+        parser.add_argument('--comments', type=int, default=1, help='Comments per task')
+        parser.add_argument('--users', type=int, default=50, help='Spread the data over this many generated users')
+        parser.add_argument('--days', type=int, default=30, help='Spread time logs over this many past days')
+        parser.add_argument('--seed', type=int, default=0, help='The same seed generates the same data')
+        parser.add_argument('--batch-size', type=int, default=GENERATION_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=1, help='Insert batches from this many processes')
+        parser.add_argument('--clear', action='store_true', help='Delete existing tasks, time logs and comments first')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='Do not ask for confirmation before clearing')
 
     def handle(self, *args, **options):
-        Task.objects.all().delete()
-        TimeLog.objects.all().delete()
-
-        users = User.objects.all()
-
-        task_list = []
-        timelog_list = []
-        for i in range(25000):
-            task_user = random.choice(users)
-            task_owner = random.choice(users)
-            task = Task(
-                title=f"Задача {i}",
-                description=f"Описание для задачи {i}",
-                owner=task_owner,
-                user=task_user
-            )
-            task_list.append(task)
-            for j in range(2):
-                start_time = timezone.now() - timezone.timedelta(days=random.randint(0, 30))
-                end_time = start_time + timezone.timedelta(hours=random.randint(1, 10))
-                timer_creater = random.choice(users)
-                timelog = TimeLog(
-                    task=task,
-                    start_time=start_time,
-                    end_time=end_time,
-                    duration=(end_time - start_time).seconds // 60,
-                    user=timer_creater
-                )
-                timelog_list.append(timelog)
-
-        Task.objects.bulk_create(task_list)
-        TimeLog.objects.bulk_create(timelog_list)
-
-        self.stdout.write(self.style.SUCCESS('Successfully created random tasks and time logs'))
+        if options['workers'] > 1 and connection.vendor == 'sqlite':
+            raise CommandError('SQLite allows a single writer, --workers needs PostgreSQL')
+        if options['clear'] and not self.clear(options['interactive']):
+            self.stdout.write('Cancelled.')
+            return
+
+        user_ids = ensure_users(options['users'])
+        spec = build_spec(options['tasks'], user_ids, logs_per_task=options['logs_per_task'],
+                          comments_per_task=options['comments'], days=options['days'], seed=options['seed'],
+                          batch_size=options['batch_size'])
+        created = 0
+        for count in load_random_data(spec, workers=options['workers']):
+            created += count
+            self.stdout.write(f"Created {created}/{spec.tasks} tasks")
+        call_command('rebuild_rollups', stdout=self.stdout)
+
+        self.stdout.write(self.style.SUCCESS('Successfully created random tasks, time logs and comments'))
+
+    def clear(self, interactive):
+        if interactive:
+            answer = input('This deletes every task, time log and comment. Type "yes" to continue: ')
+            if answer != 'yes':
+                return False
+        # Children first, the rollups and tombstones left behind by their delete signals go last.
+        models = (TimeLog, Comment, Task, TaskDailyDuration, UserDailyDuration, Tombstone)
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                tables = ', '.join(connection.ops.quote_name(model._meta.db_table) for model in models)
+                with connection.cursor() as cursor:
+                    cursor.execute(f'TRUNCATE {tables} RESTART IDENTITY CASCADE')
+            else:
+                for model in models:
+                    model.objects.all().delete()
+        # Cached task lists, details and aggregates describe the deleted rows.
+        cache.clear()
+        return True
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.tasks.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Deletes the delta sync tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        deleted = purge_tombstones()
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} tombstones older than {settings.SYNC_TOMBSTONE_RETENTION_DAYS} days'
+        ))
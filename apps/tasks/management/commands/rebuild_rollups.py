@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.tasks import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the denormalized time log rollups and comment counts from scratch or verifies them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help='Only report rows that differ from the raw time logs and comments, do not write')
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            self.verify()
+            return
+
+        with transaction.atomic():
+            updated = rollups.rebuild_task_total_durations()
+            self.stdout.write(f'Rebuilt total duration for {updated} tasks')
+            updated = rollups.rebuild_task_comment_counts()
+            self.stdout.write(f'Rebuilt comment count for {updated} tasks')
+            created = rollups.rebuild_task_daily_durations()
+            self.stdout.write(f'Rebuilt {created} task daily durations')
+            created = rollups.rebuild_user_daily_durations()
+            self.stdout.write(f'Rebuilt {created} user daily durations')
+        self.stdout.write(self.style.SUCCESS('Rollups rebuilt'))
+
+    def verify(self):
+        mismatches = 0
+        for task_id, stored, expected in rollups.task_total_duration_mismatches():
+            self.stdout.write(f'Task {task_id}: total_duration is {stored}, expected {expected}')
+            mismatches += 1
+        for task_id, stored, expected in rollups.task_comment_count_mismatches():
+            self.stdout.write(f'Task {task_id}: comment_count is {stored}, expected {expected}')
+            mismatches += 1
+        for (task_id, day), stored, expected in rollups.task_daily_duration_mismatches():
+            self.stdout.write(f'Task {task_id} on {day}: (owner, duration) is {stored}, expected {expected}')
+            mismatches += 1
+        for (user_id, day), stored, expected in rollups.user_daily_duration_mismatches():
+            self.stdout.write(f'User {user_id} on {day}: daily duration is {stored}, expected {expected}')
+            mismatches += 1
+        if mismatches:
+            raise CommandError(f'{mismatches} rollup rows are out of date')
+        self.stdout.write(self.style.SUCCESS('Rollups are up to date'))
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_total_duration(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    TimeLog = apps.get_model('tasks', 'TimeLog')
+    total = TimeLog.objects.filter(task=OuterRef('pk')).values('task').annotate(total=Sum('duration')).values('total')
+    Task.objects.update(total_duration=Coalesce(Subquery(total), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_alter_timelog_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='total_duration',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_total_duration, migrations.RunPython.noop),
+    ]
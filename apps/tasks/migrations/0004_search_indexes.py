@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# icontains compiles to UPPER(col::text) LIKE UPPER(%s) on PostgreSQL, so the trigram
+# indexes are built on that expression; the comment index matches SearchVector(config="english").
+CREATE_INDEXES = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS tasks_task_title_trgm ON tasks_task USING gin ((UPPER(title::text)) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS tasks_task_description_trgm '
+    'ON tasks_task USING gin ((UPPER(description::text)) gin_trgm_ops)',
+    "CREATE INDEX IF NOT EXISTS tasks_comment_text_fts "
+    "ON tasks_comment USING gin (to_tsvector('english'::regconfig, COALESCE(text, '')))",
+]
+
+DROP_INDEXES = [
+    'DROP INDEX IF EXISTS tasks_task_title_trgm',
+    'DROP INDEX IF EXISTS tasks_task_description_trgm',
+    'DROP INDEX IF EXISTS tasks_comment_text_fts',
+]
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_task_total_duration'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_postgresql(CREATE_INDEXES), run_on_postgresql(DROP_INDEXES)),
+    ]
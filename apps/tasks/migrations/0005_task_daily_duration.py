@@ -0,0 +1,49 @@
+# Generated by Django 3.2.16 on 2026-10-18 02:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+
+
+def populate_task_daily_durations(apps, schema_editor):
+    TimeLog = apps.get_model('tasks', 'TimeLog')
+    TaskDailyDuration = apps.get_model('tasks', 'TaskDailyDuration')
+    rows = TimeLog.objects.annotate(day=TruncDate('start_time')).values('task', 'day').annotate(
+        total=Sum('duration'), owner=F('task__owner')).order_by().values_list('task', 'day', 'owner', 'total')
+    TaskDailyDuration.objects.bulk_create(
+        (TaskDailyDuration(task_id=task_id, day=day, owner_id=owner_id, duration=total)
+         for task_id, day, owner_id, total in rows.iterator()),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tasks', '0004_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskDailyDuration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('duration', models.PositiveIntegerField(default=0)),
+                ('owner', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_durations', to=settings.AUTH_USER_MODEL)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_durations', to='tasks.task')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='taskdailyduration',
+            index=models.Index(fields=['owner', 'day'], name='task_daily_duration_owner_day'),
+        ),
+        migrations.AddConstraint(
+            model_name='taskdailyduration',
+            constraint=models.UniqueConstraint(fields=('task', 'day'), name='task_daily_duration_unique'),
+        ),
+        migrations.RunPython(populate_task_daily_durations, migrations.RunPython.noop),
+    ]
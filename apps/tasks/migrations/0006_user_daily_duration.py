@@ -0,0 +1,43 @@
+# Generated by Django 3.2.16 on 2026-10-18 02:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+
+def populate_user_daily_durations(apps, schema_editor):
+    TimeLog = apps.get_model('tasks', 'TimeLog')
+    UserDailyDuration = apps.get_model('tasks', 'UserDailyDuration')
+    rows = TimeLog.objects.annotate(day=TruncDate('start_time')).values('user', 'day').annotate(
+        total=Sum('duration')).order_by().values_list('user', 'day', 'total')
+    UserDailyDuration.objects.bulk_create(
+        (UserDailyDuration(user_id=user_id, day=day, duration=total) for user_id, day, total in rows.iterator()),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tasks', '0005_task_daily_duration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDailyDuration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('duration', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_daily_durations', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='userdailyduration',
+            constraint=models.UniqueConstraint(fields=('user', 'day'), name='user_daily_duration_unique'),
+        ),
+        migrations.RunPython(populate_user_daily_durations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2.16 on 2026-10-18 02:26
+
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def close_duplicate_open_timers(apps, schema_editor):
+    """Keep the newest open timer per task so the one-open-timer constraint can be created."""
+    TimeLog = apps.get_model('tasks', 'TimeLog')
+    open_timers = TimeLog.objects.filter(end_time__isnull=True)
+    duplicated = list(open_timers.values('task').annotate(count=Count('id')).filter(count__gt=1).values_list(
+        'task', flat=True))
+    for task_id in duplicated:
+        newest = open_timers.filter(task_id=task_id).latest('start_time', 'id')
+        open_timers.filter(task_id=task_id).exclude(pk=newest.pk).update(end_time=F('start_time'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_user_daily_duration'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_duplicate_open_timers, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['owner', 'status'], name='task_owner_status'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status'], name='task_status'),
+        ),
+        migrations.AddIndex(
+            model_name='timelog',
+            index=models.Index(fields=['task', 'start_time'], name='timelog_task_start'),
+        ),
+        migrations.AddIndex(
+            model_name='timelog',
+            index=models.Index(fields=['user', 'start_time'], name='timelog_user_start'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelog',
+            constraint=models.UniqueConstraint(condition=models.Q(('end_time__isnull', True)), fields=('task',), name='timelog_one_open_per_task'),
+        ),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from collections import namedtuple
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 
@@ -14,12 +16,69 @@ class Task(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_tasks')
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.TODO)
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='assigned_tasks', null=True)
+    # Sum of TimeLog.duration for this task, kept current by apps.tasks.signals.
+    total_duration = models.PositiveIntegerField(default=0)
+    # Number of comments of this task, kept current by apps.tasks.signals.
+    comment_count = models.PositiveIntegerField(default=0)
+    # Delta sync position, queryset.update() and bulk_update() callers must set it themselves.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "status"], name="task_owner_status"),
+            models.Index(fields=["status"], name="task_status"),
+            models.Index(fields=["owner", "updated_at"], name="task_owner_updated"),
+            models.Index(fields=["user", "updated_at"], name="task_user_updated"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "owner_id" not in instance.get_deferred_fields():
+            instance.remember_owner()
+        return instance
+
+    def remember_owner(self):
+        self._loaded_owner_id = self.owner_id
+
+    def get_loaded_owner_id(self):
+        return getattr(self, "_loaded_owner_id", self.owner_id)
 
 
 class Comment(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
     text = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Comment threads are read in id order, `since_id` polling only touches the newer rows.
+            models.Index(fields=["task", "id"], name="comment_task_id"),
+            # Delta sync reads the changes of one user's tasks, not every change since the cursor.
+            models.Index(fields=["task", "updated_at"], name="comment_task_updated"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "task_id" not in instance.get_deferred_fields():
+            instance.remember_task()
+        return instance
+
+    def remember_task(self):
+        self._loaded_task_id = self.task_id
+
+    def get_loaded_task_id(self):
+        return getattr(self, "_loaded_task_id", self.task_id)
+
+    def save(self, *args, **kwargs):
+        # Task.comment_count is updated from post_save, keep it in the same transaction as the row.
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
+
+TimeLogState = namedtuple("TimeLogState", ("task_id", "user_id", "start_time", "duration"))
 
 
 class TimeLog(models.Model):
@@ -28,3 +87,94 @@ class TimeLog(models.Model):
     end_time = models.DateTimeField(null=True, blank=True)
     duration = models.PositiveIntegerField(default=0)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='user_timelog')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # Also serves the "running timer" lookups on (task, end_time IS NULL).
+            models.UniqueConstraint(fields=["task"], condition=models.Q(end_time__isnull=True),
+                                    name="timelog_one_open_per_task"),
+        ]
+        indexes = [
+            models.Index(fields=["task", "start_time"], name="timelog_task_start"),
+            models.Index(fields=["user", "start_time"], name="timelog_user_start"),
+            models.Index(fields=["task", "updated_at"], name="timelog_task_updated"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields().intersection(TimeLogState._fields):
+            instance.remember_state()
+        return instance
+
+    def get_state(self):
+        return TimeLogState(self.task_id, self.user_id, self.start_time, self.duration)
+
+    def remember_state(self, state=None):
+        """Keep the persisted values so rollups can subtract them when the log changes."""
+        self._loaded_state = state or self.get_state()
+
+    def get_loaded_state(self):
+        return getattr(self, "_loaded_state", None)
+
+    def save(self, *args, **kwargs):
+        # Rollups are updated from post_save, keep them in the same transaction as the row.
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
+
+class Tombstone(models.Model):
+    """
+    A deleted task, comment or time log, reported by the changes endpoint to the owner and the
+    creator of its task at the time of deletion. A task assigned away from its owner also leaves
+    one for that owner only.
+    """
+
+    class Kind(models.TextChoices):
+        TASK = "task"
+        COMMENT = "comment"
+        TIME_LOG = "time_log"
+
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    object_id = models.BigIntegerField()
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', null=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', null=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "deleted_at"], name="tombstone_owner_deleted"),
+            models.Index(fields=["user", "deleted_at"], name="tombstone_user_deleted"),
+            models.Index(fields=["deleted_at"], name="tombstone_deleted"),
+        ]
+
+
+class TaskDailyDuration(models.Model):
+    """Minutes logged per task and day, denormalized with the task owner for the `top` leaderboard."""
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_durations', null=True)
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='daily_durations')
+    day = models.DateField()
+    duration = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["task", "day"], name="task_daily_duration_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["owner", "day"], name="task_daily_duration_owner_day"),
+        ]
+
+
+class UserDailyDuration(models.Model):
+    """Minutes logged per user and day, backs the time logged endpoint."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='user_daily_durations')
+    day = models.DateField()
+    duration = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day"], name="user_daily_duration_unique"),
+        ]
@@ -0,0 +1,128 @@
+import csv
+import multiprocessing
+import random
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from functools import partial
+from io import StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from apps.tasks.models import Comment, Task, TimeLog
+
+GENERATION_BATCH_SIZE = 5000
+
+TASK_FIELDS = ("id", "title", "description", "user_id", "owner_id", "status", "total_duration", "comment_count",
+               "updated_at")
+TIME_LOG_FIELDS = ("task_id", "user_id", "start_time", "end_time", "duration", "updated_at")
+COMMENT_FIELDS = ("task_id", "user_id", "text", "updated_at")
+
+RandomDataSpec = namedtuple(
+    "RandomDataSpec",
+    ("first_task_id", "tasks", "logs_per_task", "comments_per_task", "user_ids", "until", "days", "seed", "batch_size"),
+)
+
+
+def ensure_users(count):
+    """Return the ids of ``count`` generated users, creating the missing ones."""
+    usernames = [f"random{i}@example.com" for i in range(count)]
+    existing = set(User.objects.filter(username__in=usernames).values_list("username", flat=True))
+    password = make_password(None)
+    User.objects.bulk_create([
+        User(username=username, email=username, password=password)
+        for username in usernames if username not in existing
+    ], batch_size=GENERATION_BATCH_SIZE)
+    return list(User.objects.filter(username__in=usernames).order_by("pk").values_list("pk", flat=True))
+
+
+def build_spec(tasks, user_ids, logs_per_task=2, comments_per_task=1, days=30, seed=0,
+               batch_size=GENERATION_BATCH_SIZE):
+    """
+    Describe a dataset that continues after the existing tasks. Time logs end before the start of
+    today, so the same arguments produce the same rows for the whole day.
+    """
+    first_task_id = (Task.objects.aggregate(last_id=Max("id"))["last_id"] or 0) + 1
+    until = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+    return RandomDataSpec(first_task_id, tasks, logs_per_task, comments_per_task, tuple(user_ids), until, days, seed,
+                          batch_size)
+
+
+def batch_count(spec):
+    return -(-spec.tasks // spec.batch_size)
+
+
+def generate_batch(spec, batch):
+    """
+    Rows of one batch as tuples of TASK_FIELDS, TIME_LOG_FIELDS and COMMENT_FIELDS. Every batch has
+    its own random generator and explicit task ids, so batches can be generated in any order or process.
+    """
+    rng = random.Random(spec.seed * 1_000_003 + batch)
+    tasks, time_logs, comments = [], [], []
+    first = batch * spec.batch_size
+    for number in range(first, min(first + spec.batch_size, spec.tasks)):
+        task_id = spec.first_task_id + number
+        tasks.append((task_id, f"Задача {number}", f"Описание для задачи {number}", rng.choice(spec.user_ids),
+                      rng.choice(spec.user_ids), rng.choice(Task.Status.values), 0, spec.comments_per_task,
+                      spec.until))
+        for _ in range(spec.logs_per_task):
+            # Starts at least 600 minutes back, so even the longest log ends before ``until``.
+            start_time = spec.until - timedelta(minutes=rng.randint(600, spec.days * 24 * 60))
+            duration = rng.randint(60, 600)
+            time_logs.append((task_id, rng.choice(spec.user_ids), start_time, start_time + timedelta(minutes=duration),
+                              duration, spec.until))
+        for index in range(spec.comments_per_task):
+            comments.append((task_id, rng.choice(spec.user_ids), f"Комментарий {index} к задаче {number}", spec.until))
+    return tasks, time_logs, comments
+
+
+def copy_rows(model, fields, rows):
+    """Load ``rows`` with PostgreSQL COPY, several times faster than multi-row INSERTs."""
+    buffer = StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    quote_name = connection.ops.quote_name
+    columns = ", ".join(quote_name(model._meta.get_field(field).column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {quote_name(model._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def insert_rows(model, fields, rows):
+    if connection.vendor == "postgresql":
+        copy_rows(model, fields, rows)
+    else:
+        model.objects.bulk_create([model(**dict(zip(fields, row))) for row in rows], batch_size=GENERATION_BATCH_SIZE)
+
+
+def load_batch(spec, batch):
+    """
+    Generate and insert one batch. Rows bypass the model signals, the caller rebuilds the rollups.
+    """
+    tasks, time_logs, comments = generate_batch(spec, batch)
+    with transaction.atomic():
+        insert_rows(Task, TASK_FIELDS, tasks)
+        insert_rows(TimeLog, TIME_LOG_FIELDS, time_logs)
+        insert_rows(Comment, COMMENT_FIELDS, comments)
+    return len(tasks)
+
+
+def load_random_data(spec, workers=1):
+    """Insert the dataset batch by batch, yielding the number of tasks of every finished batch."""
+    batches = range(batch_count(spec))
+    if workers > 1:
+        # Forked workers must not share the parent's database connection.
+        connections.close_all()
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            yield from pool.imap_unordered(partial(load_batch, spec), batches)
+    else:
+        for batch in batches:
+            yield load_batch(spec, batch)
+
+    # Task ids were set explicitly, move the sequence past them.
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Task]):
+            cursor.execute(sql)
@@ -0,0 +1,191 @@
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from apps.tasks.models import Comment, Task, TaskDailyDuration, TimeLog, UserDailyDuration
+
+REBUILD_BATCH_SIZE = 5000
+
+logger = logging.getLogger(__name__)
+
+# Ids of the tasks this thread is deleting, their rollup rows go with them.
+_deleting = threading.local()
+
+
+def get_deleting_task_ids():
+    if not hasattr(_deleting, "task_ids"):
+        _deleting.task_ids = set()
+    return _deleting.task_ids
+
+
+def mark_task_deleting(task_id, deleting=True):
+    if deleting:
+        get_deleting_task_ids().add(task_id)
+    else:
+        get_deleting_task_ids().discard(task_id)
+
+
+def _signed(removed, added):
+    for state in removed:
+        yield state, -1
+    for state in added:
+        yield state, 1
+
+
+def _increment(model, lookup, delta, **values):
+    """
+    Add ``delta`` to ``model.duration`` for the row matching ``lookup``, creating it if needed.
+    A delta that cannot be applied is logged as drift, ``rebuild_rollups`` repairs it.
+    """
+    if model.objects.filter(**lookup).update(duration=F("duration") + delta, **values):
+        return
+    if delta < 0:
+        # Nothing was counted for this row, a negative row would only hide the drift.
+        logger.warning("Rollup drift: no %s row for %s to apply %s to", model.__name__, lookup, delta)
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(duration=delta, **lookup, **values)
+    except IntegrityError:
+        # Created concurrently by another writer, it exists now unless it was deleted again since.
+        if not model.objects.filter(**lookup).update(duration=F("duration") + delta, **values):
+            logger.warning("Rollup drift: no %s row for %s to apply %s to", model.__name__, lookup, delta)
+
+
+def update_task_total_durations(removed=(), added=()):
+    """Apply the duration difference of changed time logs to Task.total_duration."""
+    deltas = defaultdict(int)
+    for state, sign in _signed(removed, added):
+        deltas[state.task_id] += sign * state.duration
+    for task_id, delta in deltas.items():
+        if delta:
+            Task.objects.filter(pk=task_id).update(total_duration=F("total_duration") + delta,
+                                                   updated_at=timezone.now())
+
+
+def update_task_comment_counts(removed=(), added=()):
+    """Apply the task ids of removed and added comments to Task.comment_count."""
+    deltas = Counter(added)
+    deltas.subtract(removed)
+    for task_id, delta in deltas.items():
+        if delta:
+            Task.objects.filter(pk=task_id).update(comment_count=F("comment_count") + delta, updated_at=timezone.now())
+
+
+def update_task_daily_durations(removed=(), added=()):
+    """Apply the duration difference of changed time logs to the per task and day rollup."""
+    deltas = defaultdict(int)
+    for state, sign in _signed(removed, added):
+        deltas[state.task_id, timezone.localdate(state.start_time)] += sign * state.duration
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    owners = dict(Task.objects.filter(pk__in={task_id for task_id, _ in deltas}).values_list("id", "owner_id"))
+    deleting = get_deleting_task_ids()
+    for (task_id, day), delta in deltas.items():
+        if task_id in owners and task_id not in deleting:
+            _increment(TaskDailyDuration, {"task_id": task_id, "day": day}, delta, owner_id=owners[task_id])
+
+
+def update_user_daily_durations(removed=(), added=()):
+    """Apply the duration difference of changed time logs to the per user and day rollup."""
+    deltas = defaultdict(int)
+    for state, sign in _signed(removed, added):
+        deltas[state.user_id, timezone.localdate(state.start_time)] += sign * state.duration
+    for (user_id, day), delta in deltas.items():
+        if delta:
+            _increment(UserDailyDuration, {"user_id": user_id, "day": day}, delta)
+
+
+def _bulk_create_in_batches(rows, model):
+    created = 0
+    while batch := [row for _, row in zip(range(REBUILD_BATCH_SIZE), rows)]:
+        model.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def _mismatches(expected, stored):
+    expected = {key: value for key, value in expected if value[-1]}
+    stored = {key: value for key, value in stored if value[-1]}
+    return sorted(
+        (key, stored.get(key), expected.get(key)) for key in expected.keys() | stored.keys()
+        if stored.get(key) != expected.get(key)
+    )
+
+
+def task_total_duration_expression():
+    total = TimeLog.objects.filter(task=OuterRef("pk")).values("task").annotate(total=Sum("duration")).values("total")
+    return Coalesce(Subquery(total), 0)
+
+
+def rebuild_task_total_durations():
+    return Task.objects.update(total_duration=task_total_duration_expression())
+
+
+def task_total_duration_mismatches():
+    return Task.objects.annotate(expected=task_total_duration_expression()).exclude(
+        total_duration=F("expected")).values_list("id", "total_duration", "expected")
+
+
+def task_comment_count_expression():
+    count = Comment.objects.filter(task=OuterRef("pk")).values("task").annotate(count=Count("id")).values("count")
+    return Coalesce(Subquery(count), 0)
+
+
+def rebuild_task_comment_counts():
+    return Task.objects.update(comment_count=task_comment_count_expression())
+
+
+def task_comment_count_mismatches():
+    return Task.objects.annotate(expected=task_comment_count_expression()).exclude(
+        comment_count=F("expected")).values_list("id", "comment_count", "expected")
+
+
+def expected_task_daily_durations():
+    return TimeLog.objects.annotate(day=TruncDate("start_time")).values("task", "day").annotate(
+        total=Sum("duration"), owner=F("task__owner")).order_by().values_list("task", "day", "owner", "total")
+
+
+def rebuild_task_daily_durations():
+    TaskDailyDuration.objects.all().delete()
+    rows = (
+        TaskDailyDuration(task_id=task_id, day=day, owner_id=owner_id, duration=total)
+        for task_id, day, owner_id, total in expected_task_daily_durations().iterator(chunk_size=REBUILD_BATCH_SIZE)
+    )
+    return _bulk_create_in_batches(rows, TaskDailyDuration)
+
+
+def task_daily_duration_mismatches():
+    return _mismatches(
+        (((task_id, day), (owner_id, total)) for task_id, day, owner_id, total in expected_task_daily_durations()),
+        (((task_id, day), (owner_id, duration)) for task_id, day, owner_id, duration in
+         TaskDailyDuration.objects.values_list("task", "day", "owner", "duration")),
+    )
+
+
+def expected_user_daily_durations():
+    return TimeLog.objects.annotate(day=TruncDate("start_time")).values("user", "day").annotate(
+        total=Sum("duration")).order_by().values_list("user", "day", "total")
+
+
+def rebuild_user_daily_durations():
+    UserDailyDuration.objects.all().delete()
+    rows = (
+        UserDailyDuration(user_id=user_id, day=day, duration=total)
+        for user_id, day, total in expected_user_daily_durations().iterator(chunk_size=REBUILD_BATCH_SIZE)
+    )
+    return _bulk_create_in_batches(rows, UserDailyDuration)
+
+
+def user_daily_duration_mismatches():
+    return _mismatches(
+        (((user_id, day), (total,)) for user_id, day, total in expected_user_daily_durations()),
+        (((user_id, day), (duration,)) for user_id, day, duration in
+         UserDailyDuration.objects.values_list("user", "day", "duration")),
+    )
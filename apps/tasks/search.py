@@ -0,0 +1,39 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+# Must match the expression indexes created in migration 0004_search_indexes.
+SEARCH_CONFIG = "english"
+
+
+def is_postgresql():
+    return connection.vendor == "postgresql"
+
+
+def search_tasks(queryset, query):
+    """
+    Tasks whose title or description contains ``query``. On PostgreSQL the ``icontains``
+    lookups hit the trigram GIN indexes and results are ranked by similarity.
+    """
+    queryset = queryset.filter(Q(title__icontains=query) | Q(description__icontains=query))
+    if not is_postgresql():
+        return queryset.order_by("id")
+    return queryset.annotate(
+        rank=Greatest(TrigramSimilarity("title", query), TrigramSimilarity("description", query)),
+    ).order_by("-rank", "id")
+
+
+def search_comments(queryset, query):
+    """
+    Full-text search over Comment.text ranked by ts_rank on PostgreSQL, a plain
+    ``icontains`` filter elsewhere.
+    """
+    if not is_postgresql():
+        return queryset.filter(text__icontains=query).order_by("id")
+    search_query = SearchQuery(query, config=SEARCH_CONFIG)
+    return queryset.annotate(
+        search=SearchVector("text", config=SEARCH_CONFIG),
+    ).filter(search=search_query).annotate(
+        rank=SearchRank(F("search"), search_query),
+    ).order_by("-rank", "id")
@@ -1,7 +1,13 @@
+from datetime import timedelta
+
+from dateutil.relativedelta import relativedelta
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from rest_framework import serializers
-from apps.tasks.models import Task, Comment, TimeLog
+from apps.tasks.models import Task, Comment, TimeLog, Tombstone
+from apps.tasks.sync import decode_sync_token
+from apps.tasks.timers import start_timer, stop_timer
 
 
 class TaskSerializer(serializers.ModelSerializer):
@@ -12,9 +18,18 @@ class TaskSerializer(serializers.ModelSerializer):
 
 class TaskListSerializer(serializers.ModelSerializer):
     total_duration = serializers.IntegerField()
+    comment_count = serializers.IntegerField()
 
     class Meta:
         model = Task
+        fields = ("id", "title", "description", "total_duration", "comment_count")
+
+
+class TopTaskSerializer(TaskListSerializer):
+    total_duration = serializers.IntegerField(source="last_month_duration")
+
+    class Meta(TaskListSerializer.Meta):
+        # Without comment_count, comments would have to expire the cached leaderboards.
         fields = ("id", "title", "description", "total_duration")
 
 
@@ -22,6 +37,27 @@ class TaskAssignSerializer(serializers.Serializer):
     user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
 
 
+class BulkTaskIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=10000)
+
+
+class BulkTaskAssignSerializer(BulkTaskIdsSerializer):
+    user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
+
+
+class BulkTaskUpdateSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField()
+
+    class Meta:
+        model = Task
+        fields = ("id", "title", "description", "status")
+        extra_kwargs = {
+            "title": {"required": False},
+            "description": {"required": False},
+            "status": {"required": False},
+        }
+
+
 class ShortTaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
@@ -40,6 +76,11 @@ class AllCommentSerializer(serializers.ModelSerializer):
         fields = ("id", "task", "user", "text")
 
 
+class CommentSinceSerializer(serializers.Serializer):
+    since_id = serializers.IntegerField(min_value=0, required=False,
+                                        help_text="Only return comments with a greater id, for polling.")
+
+
 class TimeLogSerializer(serializers.ModelSerializer):
     start_time = serializers.DateTimeField(format="%Y-%m-%d %H:%M")
     end_time = serializers.DateTimeField(format="%Y-%m-%d %H:%M", allow_null=True)
@@ -48,6 +89,49 @@ class TimeLogSerializer(serializers.ModelSerializer):
         model = TimeLog
         fields = ("task", "start_time", "end_time", "duration")
 
+    def validate(self, attrs):
+        if attrs.get("end_time") is None and TimeLog.objects.filter(task=attrs["task"], end_time__isnull=True).exists():
+            raise serializers.ValidationError("A timer is already running for this task")
+        if attrs.get("end_time") is None:
+            # A running timer logs nothing until it is stopped, stop_timer() relies on it.
+            attrs["duration"] = 0
+        return attrs
+
+    def create(self, validated_data):
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            # A concurrent request opened a timer after validate(), timelog_one_open_per_task caught it.
+            if validated_data.get("end_time") is not None:
+                raise
+            raise serializers.ValidationError("A timer is already running for this task")
+
+
+class BulkTimeLogSerializer(serializers.Serializer):
+    """
+    One entry of a bulk upload. ``task`` is a plain id, the views check all ids of a
+    batch with a single query instead of one lookup per entry.
+    """
+
+    task = serializers.IntegerField()
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField(required=False)
+    duration = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, attrs):
+        # Uploaded entries are finished logs, only one open timer per task is allowed.
+        end_time = attrs.get("end_time")
+        if end_time is None and "duration" not in attrs:
+            raise serializers.ValidationError("Either end_time or duration is required")
+        if end_time is None:
+            attrs["end_time"] = attrs["start_time"] + timedelta(minutes=attrs["duration"])
+        elif end_time < attrs["start_time"]:
+            raise serializers.ValidationError("end_time must not be earlier than start_time")
+        if "duration" not in attrs:
+            attrs["duration"] = int((end_time - attrs["start_time"]).total_seconds() // 60)
+        return attrs
+
 
 class CreateTimeLogSerializer(serializers.ModelSerializer):
     task = serializers.PrimaryKeyRelatedField(queryset=Task.objects.all())
@@ -56,10 +140,12 @@ class CreateTimeLogSerializer(serializers.ModelSerializer):
         model = TimeLog
         fields = ("task",)
 
-    def validate_task(self, value):
-        if TimeLog.objects.filter(task=value, end_time__isnull=True).exists():
-            raise serializers.ValidationError("A timer is already running for this task")
-        return value
+    def create(self, validated_data):
+        # The INSERT itself yields to a running timer, a check before it could race a double click.
+        time_log = start_timer(validated_data["task"], validated_data["user"])
+        if time_log is None:
+            raise serializers.ValidationError({"task": ["A timer is already running for this task"]})
+        return time_log
 
 
 class StopTimeLogSerializer(serializers.ModelSerializer):
@@ -69,15 +155,96 @@ class StopTimeLogSerializer(serializers.ModelSerializer):
         model = TimeLog
         fields = ("task",)
 
-    def validate_task(self, value):
-        active_timer = TimeLog.objects.filter(task=value, end_time__isnull=True)
-        if not active_timer.exists():
-            raise serializers.ValidationError("No running timer found for this task")
-        return value
-
     def save(self, **kwargs):
-        task = self.validated_data['task']
-        time_log = TimeLog.objects.get(task=task, end_time__isnull=True)
-        time_log.end_time = timezone.now()
-        time_log.duration = (time_log.end_time - time_log.start_time).seconds // 60
-        time_log.save()
+        time_log = stop_timer(self.validated_data['task'])
+        if time_log is None:
+            raise serializers.ValidationError({"task": ["No running timer found for this task"]})
+        self.instance = time_log
+        return time_log
+
+
+class DateRangeSerializer(serializers.Serializer):
+    """Inclusive ``from``/``to`` dates, defaulting to the last month."""
+
+    def get_fields(self):
+        # "from" is a Python keyword and cannot be declared as a class attribute.
+        fields = super().get_fields()
+        fields["from"] = serializers.DateField(required=False)
+        fields["to"] = serializers.DateField(required=False)
+        return fields
+
+    def validate(self, attrs):
+        date_to = attrs.get("to") or timezone.localdate()
+        date_from = attrs.get("from") or date_to - relativedelta(months=1)
+        if date_from > date_to:
+            raise serializers.ValidationError("`from` must not be later than `to`")
+        return {**attrs, "from": date_from, "to": date_to}
+
+
+class DashboardSerializer(DateRangeSerializer):
+    """Number of tasks per dashboard section, ``from``/``to`` apply to the time logged section."""
+
+    my_limit = serializers.IntegerField(min_value=0, max_value=100, default=10)
+    created_limit = serializers.IntegerField(min_value=0, max_value=100, default=10)
+    top_limit = serializers.IntegerField(min_value=0, max_value=20, default=10)
+
+
+class SyncSerializer(serializers.Serializer):
+    sync_token = serializers.CharField(required=False, help_text="`sync_token` of the previous response.")
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=500, help_text="Rows per kind.")
+
+    def validate_sync_token(self, value):
+        try:
+            return decode_sync_token(value)
+        except ValueError:
+            raise serializers.ValidationError("Invalid sync token")
+
+
+class TaskSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Task
+        fields = ("id", "title", "description", "status", "user", "owner", "total_duration", "comment_count",
+                  "updated_at")
+
+
+class CommentSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Comment
+        fields = ("id", "task", "user", "text", "updated_at")
+
+
+class TimeLogSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TimeLog
+        fields = ("id", "task", "user", "start_time", "end_time", "duration", "updated_at")
+
+
+class TombstoneSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source="object_id")
+
+    class Meta:
+        model = Tombstone
+        fields = ("kind", "id", "deleted_at")
+
+
+class TaskExportSerializer(serializers.Serializer):
+    """Filters on the owner and status of the task and on the day it was last updated."""
+
+    output = serializers.ChoiceField(choices=["ndjson", "csv"], default="ndjson")
+    owner = serializers.IntegerField(required=False)
+    status = serializers.ChoiceField(choices=Task.Status.choices, required=False)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fields["from"] = serializers.DateField(required=False)
+        fields["to"] = serializers.DateField(required=False)
+        return fields
+
+    def validate(self, attrs):
+        if "from" in attrs and "to" in attrs and attrs["from"] > attrs["to"]:
+            raise serializers.ValidationError("`from` must not be later than `to`")
+        return attrs
+
+
+class TimeLogExportSerializer(TaskExportSerializer):
+    """Filters on the owner and status of the task and on the start date of the time log."""
@@ -0,0 +1,109 @@
+from itertools import chain
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from apps.tasks import rollups, sync
+from apps.tasks.caching import invalidate_tasks, owner_tasks_changes, task_comments_changes, \
+    task_time_logs_changes, top_tasks_cache
+from apps.tasks.models import Comment, Task, TaskDailyDuration, TimeLog, Tombstone
+
+# Sent with ``removed`` and ``added`` lists of TimeLogState. Bulk code paths that
+# bypass model signals (bulk_create, raw updates) must send it themselves.
+time_logs_changed = Signal()
+
+
+@receiver(pre_save, sender=TimeLog)
+def load_time_log_state(sender, instance, **kwargs):
+    if instance.pk is None or instance.get_loaded_state() is not None:
+        return
+    persisted = TimeLog.objects.filter(pk=instance.pk).first()
+    if persisted is not None:
+        instance.remember_state(persisted.get_state())
+
+
+@receiver(post_save, sender=TimeLog)
+def time_log_saved(sender, instance, created, **kwargs):
+    previous = None if created else instance.get_loaded_state()
+    current = instance.get_state()
+    if previous != current:
+        time_logs_changed.send(sender=TimeLog, removed=[previous] if previous else [], added=[current])
+    else:
+        # end_time is not part of the state but shows up in the time_logs list.
+        task_time_logs_changes.bump([instance.task_id])
+    instance.remember_state()
+
+
+@receiver(post_delete, sender=TimeLog)
+def time_log_deleted(sender, instance, **kwargs):
+    state = instance.get_loaded_state() or instance.get_state()
+    time_logs_changed.send(sender=TimeLog, removed=[state], added=[])
+    sync.record_deletion(Tombstone.Kind.TIME_LOG, instance.pk, state.task_id)
+
+
+@receiver(time_logs_changed)
+def update_time_log_rollups(sender, removed, added, **kwargs):
+    rollups.update_task_total_durations(removed, added)
+    rollups.update_task_daily_durations(removed, added)
+    rollups.update_user_daily_durations(removed, added)
+
+
+@receiver(time_logs_changed)
+def invalidate_top_tasks(sender, removed, added, **kwargs):
+    task_ids = {state.task_id for state in chain(removed, added)}
+    owner_ids = set(Task.objects.filter(pk__in=task_ids).exclude(owner=None).values_list("owner_id", flat=True))
+    top_tasks_cache.invalidate(owner_ids)
+    # total_duration of the tasks changed as well.
+    owner_tasks_changes.bump(owner_ids)
+    task_time_logs_changes.bump(task_ids)
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, **kwargs):
+    if not created and instance.get_loaded_owner_id() != instance.owner_id:
+        TaskDailyDuration.objects.filter(task=instance).update(owner_id=instance.owner_id)
+        sync.touch_task_rows([instance.pk])
+        sync.record_reassignments([(instance.pk, instance.get_loaded_owner_id(), instance.user_id)], instance.owner_id)
+    top_tasks_cache.invalidate({instance.get_loaded_owner_id(), instance.owner_id} - {None})
+    owner_tasks_changes.bump({instance.get_loaded_owner_id(), instance.owner_id})
+    instance.remember_owner()
+    invalidate_tasks([instance.pk])
+
+
+@receiver(pre_delete, sender=Task)
+def task_deleting(sender, instance, **kwargs):
+    # The cascade deletes TaskDailyDuration before the time logs, their signals must not decrement it.
+    rollups.mark_task_deleting(instance.pk)
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    rollups.mark_task_deleting(instance.pk, deleting=False)
+    Tombstone.objects.create(kind=Tombstone.Kind.TASK, object_id=instance.pk, owner_id=instance.owner_id,
+                             user_id=instance.user_id)
+    top_tasks_cache.invalidate({instance.owner_id} - {None})
+    owner_tasks_changes.bump([instance.owner_id])
+    invalidate_tasks([instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    previous = None if created else instance.get_loaded_task_id()
+    if previous != instance.task_id:
+        update_comment_counts(removed=[previous] if previous else [], added=[instance.task_id])
+    task_comments_changes.bump({previous, instance.task_id})
+    instance.remember_task()
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    task_id = instance.get_loaded_task_id()
+    update_comment_counts(removed=[task_id])
+    sync.record_deletion(Tombstone.Kind.COMMENT, instance.pk, task_id)
+    task_comments_changes.bump([task_id])
+
+
+def update_comment_counts(removed=(), added=()):
+    rollups.update_task_comment_counts(removed, added)
+    # comment_count is part of the my-tasks list.
+    owner_tasks_changes.bump(Task.objects.filter(pk__in={*removed, *added}).values_list("owner_id", flat=True))
@@ -0,0 +1,152 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from apps.tasks.models import Comment, Task, TimeLog, Tombstone
+
+# Every kind is read in (position field, id) order from its own cursor in the sync token.
+SYNC_KINDS = ("tasks", "comments", "time_logs", "deleted")
+
+
+class SyncTokenExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "The sync token is older than the kept deletions, start a full sync without a token."
+    default_code = "sync_token_expired"
+
+
+def encode_sync_token(cursors):
+    data = {kind: [position.isoformat(), pk] for kind, (position, pk) in cursors.items()}
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode()).decode()
+
+
+def decode_sync_token(value):
+    """The ``{kind: (position, id)}`` cursors of a token, raises ValueError for anything else."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(value.encode()))
+        cursors = {kind: (datetime.fromisoformat(position), int(pk)) for kind, (position, pk) in data.items()}
+    except (TypeError, AttributeError, ValueError) as exc:
+        raise ValueError("Invalid sync token") from exc
+    if set(cursors) != set(SYNC_KINDS) or any(timezone.is_naive(position) for position, _ in cursors.values()):
+        raise ValueError("Invalid sync token")
+    return cursors
+
+
+def get_oldest_write_start():
+    """
+    Start of the oldest other transaction that has written and not committed yet, on PostgreSQL.
+    Rows it wrote carry an ``updated_at`` after that start and become visible only at its commit.
+    """
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT min(xact_start) FROM pg_stat_activity "
+            "WHERE datname = current_database() AND backend_xid IS NOT NULL AND pid <> pg_backend_pid()"
+        )
+        return cursor.fetchone()[0]
+
+
+def get_sync_until(now):
+    """
+    The newest position a sync may move its cursors to. It stays before every transaction still
+    writing, however long it runs, and SYNC_SETTLE_SECONDS before it to absorb the clock difference
+    between the application and the database. Other databases only have the settle window, there
+    transactions writing synced rows must be shorter than SYNC_SETTLE_SECONDS.
+    """
+    oldest_write_start = get_oldest_write_start()
+    if oldest_write_start is not None:
+        now = min(now, oldest_write_start)
+    return now - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+
+
+def get_sync_sources(user):
+    """
+    ``(kind, queryset, position field)`` of everything ``user`` syncs: their tasks and the rows of those
+    tasks. Comments and time logs are looked up per task id on (task, updated_at), so a call reads the
+    changes of this user only. One subquery per role keeps both task lookups on their own index.
+    """
+    of_tasks = (Q(task_id__in=Task.objects.filter(owner=user).values("id"))
+                | Q(task_id__in=Task.objects.filter(user=user).values("id")))
+    return [
+        ("tasks", Task.objects.filter(Q(owner=user) | Q(user=user)), "updated_at"),
+        ("comments", Comment.objects.filter(of_tasks), "updated_at"),
+        ("time_logs", TimeLog.objects.filter(of_tasks), "updated_at"),
+        ("deleted", Tombstone.objects.filter(Q(owner=user) | Q(user=user)), "deleted_at"),
+    ]
+
+
+def filter_after(queryset, field, position, pk):
+    """Rows after the ``(position, id)`` cursor, the bound on the position alone keeps it an index range."""
+    return queryset.filter(**{f"{field}__gte": position}).filter(Q(**{f"{field}__gt": position}) | Q(id__gt=pk))
+
+
+def get_changes(user, cursors=None, limit=500):
+    """
+    Rows of ``user`` created, updated or deleted after the ``cursors`` of a sync token, at most
+    ``limit`` per kind, as ``({kind: rows}, next_cursors, has_more)``.
+
+    Rows changed after get_sync_until() are left for the next call, so a transaction still in
+    flight cannot commit behind a cursor. A kind that is caught up moves its cursor to that bound.
+    Without cursors everything is returned except deletions, as the client has nothing to delete yet.
+    """
+    now = timezone.now()
+    if cursors and cursors["deleted"][0] < now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS):
+        # Tombstones after the cursor may have been purged already.
+        raise SyncTokenExpired()
+    # Bounded before the rows are read, a transaction starting later writes after the bound.
+    until = get_sync_until(now)
+    cursors = dict(cursors) if cursors else {"deleted": (until, 0)}
+
+    changes, has_more = {}, False
+    for kind, queryset, field in get_sync_sources(user):
+        queryset = queryset.filter(**{f"{field}__lte": until})
+        if kind in cursors:
+            queryset = filter_after(queryset, field, *cursors[kind])
+        rows = list(queryset.order_by(field, "id")[:limit + 1])
+        if len(rows) > limit:
+            rows, has_more = rows[:limit], True
+            cursors[kind] = (getattr(rows[-1], field), rows[-1].pk)
+        else:
+            cursors[kind] = (until, 0)
+        changes[kind] = rows
+    return changes, cursors, has_more
+
+
+def touch_task_rows(task_ids):
+    """
+    Move the comments and time logs of reassigned tasks forward, the new owner's cursor is
+    usually past them.
+    """
+    now = timezone.now()
+    Comment.objects.filter(task_id__in=task_ids).update(updated_at=now)
+    TimeLog.objects.filter(task_id__in=task_ids).update(updated_at=now)
+
+
+def record_reassignments(tasks, new_owner_id):
+    """Leave a tombstone for the previous owners of ``(task_id, owner_id, user_id)`` rows that lost the task."""
+    Tombstone.objects.bulk_create([
+        Tombstone(kind=Tombstone.Kind.TASK, object_id=task_id, owner_id=owner_id)
+        for task_id, owner_id, user_id in tasks
+        if owner_id is not None and owner_id not in (new_owner_id, user_id)
+    ])
+
+
+def record_deletion(kind, object_id, task_id):
+    """Leave a tombstone for the owner and creator of the task the deleted row belonged to."""
+    task = Task.objects.filter(pk=task_id).values("owner_id", "user_id").first()
+    if task is not None:
+        Tombstone.objects.create(kind=kind, object_id=object_id, **task)
+
+
+def purge_tombstones():
+    """Delete the tombstones no valid sync token can ask for anymore."""
+    expired = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=expired).delete()
+    return deleted
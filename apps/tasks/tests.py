@@ -1,19 +1,39 @@
+import json
+import threading
+from io import StringIO
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
 from dateutil.relativedelta import relativedelta
 from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.utils import timezone
 from rest_framework.test import APIRequestFactory, force_authenticate
 from rest_framework.test import APITestCase
-from apps.tasks.models import Task, TimeLog
+from apps.common.cache import cache_stats
+from apps.common.events import get_channel_layer, get_user_group
+from apps.common.models import OutboxEmail
+from apps.common.serializers import ValuesSerializer
+from apps.tasks.benchmarks import BENCHMARK_SETTINGS, compare_reports, run_endpoint_benchmarks, \
+    run_serializer_benchmarks, seed_dataset
+from apps.tasks.caching import get_version_key, top_tasks_cache
+from apps.tasks.models import Task, Comment, TaskDailyDuration, TimeLog, Tombstone, UserDailyDuration
+from apps.tasks.sync import encode_sync_token, filter_after, get_sync_sources
 from apps.tasks.views import TaskViewSet, CommentViewSet, TimerViewSet
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from rest_framework.reverse import reverse
-from rest_framework import status
+from rest_framework import serializers, status
 from rest_framework.exceptions import ValidationError
 from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
 
 from apps.tasks.serializers import ShortTaskSerializer, AllCommentSerializer, TaskListSerializer, TaskAssignSerializer, \
-    TimeLogSerializer, CreateCommentSerializer, StopTimeLogSerializer, CreateTimeLogSerializer
+    TimeLogSerializer, CreateCommentSerializer, StopTimeLogSerializer, CreateTimeLogSerializer, TopTaskSerializer
 
 
 class TaskViewSetTestCase(APITestCase):
@@ -65,7 +85,7 @@ class TaskViewSetTestCase(APITestCase):
         self.assertEqual(serializer_class, TaskListSerializer)
         view.action = 'top'
         serializer_class = view.get_serializer_class()
-        self.assertEqual(serializer_class, TaskListSerializer)
+        self.assertEqual(serializer_class, TopTaskSerializer)
         view.action = 'assign'
         serializer_class = view.get_serializer_class()
         self.assertEqual(serializer_class, TaskAssignSerializer)
@@ -131,7 +151,8 @@ class TaskViewSetTestCase(APITestCase):
 
     def test_get_top_20_tasks_last_month(self):
         current_month = timezone.now().month
-        cache_data = cache.get("get_top_20")
+        cache.clear()
+        cache_data = cache.get(top_tasks_cache.get_entry_key(self.user.pk))
         self.assertIsNone(cache_data)
         for i in range(21):
             start_time = timezone.now() - relativedelta(days=i)
@@ -156,7 +177,7 @@ class TaskViewSetTestCase(APITestCase):
         url = reverse('task-top')
         self.client.force_authenticate(user=self.user)
         response = self.client.get(url)
-        cache_data = cache.get("get_top")
+        cache_data = cache.get(top_tasks_cache.get_entry_key(self.user.pk))
         self.assertIsNotNone(cache_data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
@@ -212,8 +233,9 @@ class TaskViewSetTestCase(APITestCase):
             "task": self.task.id,
         }
         serializer = CreateTimeLogSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
         with self.assertRaises(ValidationError) as context:
-            serializer.is_valid(raise_exception=True)
+            serializer.save(user=self.user)
         self.assertIn("A timer is already running for this task", str(context.exception))
 
     def test_validate_task_with_no_running_timer(self):
@@ -222,8 +244,9 @@ class TaskViewSetTestCase(APITestCase):
             "task": self.task.id,
         }
         serializer = StopTimeLogSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
         with self.assertRaises(ValidationError) as context:
-            serializer.is_valid(raise_exception=True)
+            serializer.save()
         self.assertIn("No running timer found for this task", str(context.exception))
 
     def test_add_time_log_manually(self):
@@ -243,3 +266,1136 @@ class TaskViewSetTestCase(APITestCase):
         self.client.force_authenticate(user=self.user)
         response = self.client.get(url, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TaskTotalDurationTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        self.task = Task.objects.create(user=self.user, title="string", description="string", owner=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def test_total_duration_follows_time_log_writes(self):
+        time_log = TimeLog.objects.create(task=self.task, user=self.user, end_time=timezone.now(), duration=30)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.total_duration, 30)
+
+        time_log.duration = 45
+        time_log.save()
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.total_duration, 45)
+
+        time_log.delete()
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.total_duration, 0)
+
+    def test_total_duration_after_manual_time_log(self):
+        url = reverse('timer-add-time-log-manually')
+        data = {
+            'task': self.task.id,
+            'start_time': "2023-09-01 12:01",
+            'end_time': "2023-09-01 12:11",
+            'duration': 10
+        }
+        self.client.post(url, data, format='json')
+        response = self.client.get(reverse('task-my'))
+        self.assertEqual(response.data['results'][0]['total_duration'], 10)
+
+    def test_total_duration_after_stopping_timer(self):
+        TimeLog.objects.create(task=self.task, user=self.user, start_time=timezone.now() - relativedelta(minutes=20))
+        self.client.post(reverse('timer-stop'), {'task': self.task.id}, format='json')
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.total_duration, 20)
+
+    def test_rebuild_rollups_command(self):
+        TimeLog.objects.bulk_create([TimeLog(task=self.task, user=self.user, duration=15)])
+        with self.assertRaises(CommandError):
+            call_command('rebuild_rollups', '--verify', stdout=StringIO())
+        call_command('rebuild_rollups', stdout=StringIO())
+        call_command('rebuild_rollups', '--verify', stdout=StringIO())
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.total_duration, 15)
+
+
+class KeysetPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        self.tasks = [
+            Task.objects.create(user=self.user, title=f"Task {i}", description="string", owner=self.user)
+            for i in range(5)
+        ]
+        self.client.force_authenticate(user=self.user)
+
+    def test_cursor_pages_follow_id_order_without_count(self):
+        url = reverse('task-my')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'pagination': 'cursor', 'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+        ids = [item['id'] for item in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            ids += [item['id'] for item in response.data['results']]
+        self.assertEqual(ids, [task.id for task in self.tasks])
+
+    def test_page_number_pagination_is_default(self):
+        response = self.client.get(reverse('task-list'))
+        self.assertEqual(response.data['count'], 5)
+
+    def test_top_cursor_pages_ordered_by_duration(self):
+        for minutes, task in enumerate(self.tasks, start=1):
+            TimeLog.objects.create(task=task, user=self.user, end_time=timezone.now(), duration=minutes * 10)
+        response = self.client.get(reverse('task-top'), {'pagination': 'cursor', 'page_size': 3})
+        durations = [item['total_duration'] for item in response.data['results']]
+        response = self.client.get(response.data['next'])
+        durations += [item['total_duration'] for item in response.data['results']]
+        self.assertEqual(durations, [50, 40, 30, 20, 10])
+
+
+class SearchTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        self.task = Task.objects.create(user=self.user, title="Fix login page", description="Broken form",
+                                        owner=self.user)
+        Task.objects.create(user=self.user, title="Write docs", description="Describe the login flow",
+                            owner=self.user)
+        Task.objects.create(user=self.user, title="Unrelated", description="Nothing here", owner=self.user)
+        Comment.objects.create(task=self.task, user=self.user, text="The login button does nothing")
+        Comment.objects.create(task=self.task, user=self.user, text="Works for me")
+        self.client.force_authenticate(user=self.user)
+
+    def test_search_tasks_matches_title_and_description(self):
+        response = self.client.get(reverse('task-search'), {'q': 'login'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_search_comments(self):
+        response = self.client.get(reverse('comments-search'), {'q': 'login'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['text'] for item in response.data['results']], ["The login button does nothing"])
+
+    def test_search_requires_query(self):
+        response = self.client.get(reverse('task-search'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TaskDailyDurationTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        self.other_user = User.objects.create_user(username='other@example.com', email='other@example.com',
+                                                   password='testpassword')
+        self.task = Task.objects.create(user=self.user, title="string", description="string", owner=self.user)
+        cache.clear()
+
+    def test_rollup_follows_time_log_writes(self):
+        start_time = timezone.now() - relativedelta(days=3)
+        time_log = TimeLog.objects.create(task=self.task, user=self.user, start_time=start_time,
+                                          end_time=timezone.now(), duration=30)
+        TimeLog.objects.create(task=self.task, user=self.user, start_time=start_time, end_time=timezone.now(),
+                               duration=10)
+        self.assertEqual(TaskDailyDuration.objects.get(day=timezone.localdate(start_time)).duration, 40)
+
+        time_log.start_time = start_time - relativedelta(days=1)
+        time_log.save()
+        self.assertEqual(TaskDailyDuration.objects.get(day=timezone.localdate(start_time)).duration, 10)
+        self.assertEqual(TaskDailyDuration.objects.get(day=timezone.localdate(time_log.start_time)).duration, 30)
+
+    def test_rollup_owner_follows_task_owner(self):
+        TimeLog.objects.create(task=self.task, user=self.user, end_time=timezone.now(), duration=30)
+        self.task.owner = self.other_user
+        self.task.save()
+        self.assertEqual(TaskDailyDuration.objects.get().owner, self.other_user)
+
+    def test_rollup_drift_is_logged_not_stored(self):
+        time_log = TimeLog.objects.create(task=self.task, user=self.user, end_time=timezone.now(), duration=30)
+        TaskDailyDuration.objects.all().delete()
+        with self.assertLogs('apps.tasks.rollups', 'WARNING') as logs:
+            time_log.delete()
+        self.assertIn('Rollup drift: no TaskDailyDuration row', logs.output[0])
+        self.assertFalse(TaskDailyDuration.objects.exists())
+
+    def test_deleting_a_task_logs_no_drift(self):
+        TimeLog.objects.create(task=self.task, user=self.user, end_time=timezone.now(), duration=30)
+        with self.assertNoLogs('apps.tasks.rollups', 'WARNING'):
+            self.task.delete()
+        self.assertFalse(TaskDailyDuration.objects.exists())
+        self.assertFalse(UserDailyDuration.objects.filter(duration__gt=0).exists())
+
+    def test_top_reads_last_month_from_rollup(self):
+        TimeLog.objects.create(task=self.task, user=self.user, end_time=timezone.now(), duration=30)
+        TimeLog.objects.create(task=self.task, user=self.user, end_time=timezone.now(), duration=20,
+                               start_time=timezone.now() - relativedelta(months=2))
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('task-top'))
+        self.assertEqual(response.data, [{'id': self.task.id, 'title': 'string', 'description': 'string',
+                                          'total_duration': 30}])
+
+
+class UserDailyDurationTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        self.task = Task.objects.create(user=self.user, title="string", description="string", owner=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def test_time_logged_is_read_from_rollup(self):
+        TimeLog.objects.create(task=self.task, user=self.user, end_time=timezone.now(), duration=30)
+        TimeLog.objects.create(task=self.task, user=self.user, end_time=timezone.now(), duration=20,
+                               start_time=timezone.now() - relativedelta(months=2))
+        self.assertEqual(UserDailyDuration.objects.filter(user=self.user).count(), 2)
+
+        url = reverse('timer-get-time-logged-last-month')
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.data['total_time_logged'], 30)
+
+        date_from = (timezone.localdate() - relativedelta(months=3)).isoformat()
+        response = self.client.get(url, {'from': date_from})
+        self.assertEqual(response.data['total_time_logged'], 50)
+
+    def test_time_logged_rejects_inverted_range(self):
+        url = reverse('timer-get-time-logged-last-month')
+        response = self.client.get(url, {'from': '2023-09-02', 'to': '2023-09-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BulkTimeLogTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        self.task = Task.objects.create(user=self.user, title="string", description="string", owner=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_json_reports_every_entry(self):
+        data = [
+            {'task': self.task.id, 'start_time': "2023-09-01 12:01", 'end_time': "2023-09-01 12:11"},
+            {'task': 999, 'start_time': "2023-09-01 12:01", 'duration': 5},
+            {'task': self.task.id, 'start_time': "not a date"},
+        ]
+        response = self.client.post(reverse('timer-bulk'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 2))
+        self.assertIn('task', response.data['results'][1]['errors'])
+        self.assertIn('start_time', response.data['results'][2]['errors'])
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.total_duration, 10)
+
+    def test_bulk_ndjson_uses_constant_queries(self):
+        line = '{"task": %d, "start_time": "2023-09-01 12:01", "duration": 3}\n' % self.task.id
+        self.client.post(reverse('timer-bulk'), line, content_type='application/x-ndjson')
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(reverse('timer-bulk'), line * 10, content_type='application/x-ndjson')
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(reverse('timer-bulk'), line * 100, content_type='application/x-ndjson')
+        self.assertEqual(response.data['created'], 100)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+        self.assertEqual(TimeLog.objects.filter(task=self.task).count(), 111)
+
+    def test_bulk_rejects_non_list(self):
+        response = self.client.post(reverse('timer-bulk'), {'task': self.task.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BulkTaskTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        self.assignee = User.objects.create_user(username='assignee@example.com', email='assignee@example.com',
+                                                 password='testpassword')
+        self.tasks = [
+            Task.objects.create(user=self.user, title=f"Task {i}", description="string", owner=self.user)
+            for i in range(3)
+        ]
+        self.ids = [task.id for task in self.tasks]
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_create(self):
+        data = [{'title': f'New {i}', 'description': 'string'} for i in range(5)]
+        response = self.client.post(reverse('task-bulk-create'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Task.objects.filter(title__startswith='New', owner=self.user).count(), 5)
+
+    def test_bulk_update(self):
+        data = [{'id': self.ids[0], 'title': 'Renamed'}, {'id': self.ids[1], 'status': 'in_progress'}]
+        response = self.client.patch(reverse('task-bulk-update'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Task.objects.get(pk=self.ids[0]).title, 'Renamed')
+        self.assertEqual(Task.objects.get(pk=self.ids[1]).status, Task.Status.IN_PROGRESS)
+
+        response = self.client.patch(reverse('task-bulk-update'), [{'id': 999, 'title': 'x'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        data = [{'id': self.ids[0], 'title': 'First'}, {'id': self.ids[0], 'title': 'Second'}]
+        response = self.client.patch(reverse('task-bulk-update'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Task.objects.get(pk=self.ids[0]).title, 'Renamed')
+
+    def test_bulk_update_invalidates_top_tasks(self):
+        cache.clear()
+        TimeLog.objects.create(task=self.tasks[0], user=self.user, end_time=timezone.now(), duration=10)
+        self.client.get(reverse('task-top'))
+        self.client.patch(reverse('task-bulk-update'), [{'id': self.ids[0], 'title': 'Renamed'}], format='json')
+        self.assertEqual(self.client.get(reverse('task-top')).data[0]['title'], 'Renamed')
+
+    def test_bulk_assign_sends_one_notification(self):
+        TimeLog.objects.create(task=self.tasks[0], user=self.user, end_time=timezone.now(), duration=10)
+        response = self.client.post(reverse('task-bulk-assign'), {'ids': self.ids, 'user': self.assignee.id},
+                                    format='json')
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(Task.objects.filter(owner=self.assignee).count(), 3)
+        self.assertEqual(TaskDailyDuration.objects.get().owner, self.assignee)
+        self.assertEqual(list(OutboxEmail.objects.values_list('recipient', flat=True)), ['assignee@example.com'])
+
+    def test_bulk_assign_counts_only_reassigned_tasks(self):
+        self.client.post(reverse('task-bulk-assign'), {'ids': self.ids[:1], 'user': self.assignee.id}, format='json')
+        response = self.client.post(reverse('task-bulk-assign'), {'ids': self.ids, 'user': self.assignee.id},
+                                    format='json')
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(OutboxEmail.objects.latest("id").message, "2 new tasks were assigned to You")
+
+        OutboxEmail.objects.all().delete()
+        response = self.client.post(reverse('task-bulk-assign'), {'ids': self.ids, 'user': self.assignee.id},
+                                    format='json')
+        self.assertEqual(response.data['updated'], 0)
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    def test_bulk_complete_uses_fixed_number_of_queries(self):
+        with self.assertNumQueries(5):
+            response = self.client.patch(reverse('task-bulk-complete'), {'ids': self.ids}, format='json')
+        self.assertEqual(response.data['updated'], 3)
+        self.assertFalse(Task.objects.exclude(status=Task.Status.DONE).exists())
+        self.assertEqual(OutboxEmail.objects.get().recipient, 'owner@example.com')
+
+    def test_bulk_complete_counts_only_newly_completed_tasks(self):
+        self.client.patch(reverse('task-complete', args=[self.ids[0]]))
+        OutboxEmail.objects.all().delete()
+        response = self.client.patch(reverse('task-bulk-complete'), {'ids': self.ids}, format='json')
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(OutboxEmail.objects.get().message, "2 of your tasks were completed")
+
+        OutboxEmail.objects.all().delete()
+        response = self.client.patch(reverse('task-bulk-complete'), {'ids': self.ids}, format='json')
+        self.assertEqual(response.data['updated'], 0)
+        self.assertFalse(OutboxEmail.objects.exists())
+
+
+class ExportTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        self.task = Task.objects.create(user=self.user, title="string", description="string", owner=self.user)
+        Task.objects.create(user=self.user, title="done", description="string", owner=self.user,
+                            status=Task.Status.DONE)
+        TimeLog.objects.create(task=self.task, user=self.user, end_time=timezone.now(), duration=30)
+        TimeLog.objects.create(task=self.task, user=self.user, end_time=timezone.now(), duration=20,
+                               start_time=timezone.now() - relativedelta(months=2))
+        self.client.force_authenticate(user=self.user)
+
+    def test_export_tasks_ndjson(self):
+        response = self.client.get(reverse('task-export'), {'status': 'todo'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['total_duration'], 50)
+
+    def test_export_time_logs_csv_with_date_range(self):
+        date_from = (timezone.localdate() - relativedelta(days=1)).isoformat()
+        response = self.client.get(reverse('timer-export'), {'output': 'csv', 'from': date_from})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,task,user,start_time,end_time,duration')
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].endswith(',30'))
+
+    def test_export_tasks_with_date_range(self):
+        Task.objects.filter(title="done").update(updated_at=timezone.now() - relativedelta(months=2))
+        today = timezone.localdate().isoformat()
+        response = self.client.get(reverse('task-export'), {'from': today, 'to': today})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.task.pk])
+
+        response = self.client.get(reverse('task-export'), {'from': today, 'to': '2000-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class QueryPlanTestCase(APITestCase):
+    """Guards the indexes behind the hot endpoints: none of these queries may scan a whole table."""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        self.other_user = User.objects.create_user(username='other@example.com', email='other@example.com',
+                                                   password='testpassword')
+        start_time = timezone.now() - relativedelta(days=10)
+        for index in range(50):
+            owner = self.user if index % 5 == 0 else self.other_user
+            task = Task.objects.create(user=owner, title="string", description="string", owner=owner,
+                                       status=Task.Status.DONE if index % 10 == 0 else Task.Status.TODO)
+            Comment.objects.create(task=task, user=owner, text="string")
+            TimeLog.objects.create(task=task, user=owner, start_time=start_time + relativedelta(hours=index),
+                                   end_time=start_time + relativedelta(hours=index, minutes=30), duration=30)
+        self.task = task
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def get_view_queryset(self, viewset, action, **kwargs):
+        view = viewset(action_map={'get': action}, kwargs=kwargs, format_kwarg=None,
+                       **getattr(viewset, action).kwargs)
+        view.request = view.initialize_request(self.factory.get('/'))
+        view.request.user = self.user
+        return view.get_queryset()
+
+    def assertUsesIndexes(self, queryset):
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = queryset.explain()
+        for line in plan.splitlines():
+            if connection.vendor == "postgresql":
+                self.assertNotIn("Seq Scan", line, plan)
+            elif "SCAN " in line:
+                self.assertIn("USING", line, plan)
+
+    def test_task_lists_use_indexes(self):
+        for action in ["my", "created", "completed", "top"]:
+            with self.subTest(action=action):
+                self.assertUsesIndexes(self.get_view_queryset(TaskViewSet, action))
+
+    def test_task_details_use_indexes(self):
+        for action in ["comments", "time_logs"]:
+            with self.subTest(action=action):
+                self.assertUsesIndexes(self.get_view_queryset(TaskViewSet, action, pk=self.task.id))
+        self.assertUsesIndexes(Comment.objects.filter(task=self.task, id__gt=self.task.id).order_by("id"))
+
+    def test_sync_queries_use_indexes(self):
+        # Many rows of other users: a delta sync must only read the changes of the user's own tasks.
+        first_id = self.task.pk + 1
+        Task.objects.bulk_create([
+            Task(id=first_id + index, user=self.other_user, owner=self.other_user, title="string", description="string")
+            for index in range(500)
+        ])
+        Comment.objects.bulk_create([
+            Comment(task_id=first_id + index, user=self.other_user, text="string") for index in range(500)
+        ])
+        TimeLog.objects.bulk_create([
+            TimeLog(task_id=first_id + index, user=self.other_user, duration=30) for index in range(500)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        position = timezone.now() - relativedelta(minutes=5)
+        task_indexes = {"comments": "comment_task_updated", "time_logs": "timelog_task_updated"}
+        for kind, queryset, field in get_sync_sources(self.user):
+            with self.subTest(kind=kind):
+                queryset = filter_after(queryset, field, position, 0).order_by(field, "id")[:500]
+                self.assertUsesIndexes(queryset)
+                if kind in task_indexes:
+                    self.assertIn(task_indexes[kind], queryset.explain())
+
+    def test_timer_queries_use_indexes(self):
+        window = (timezone.now() - relativedelta(days=7), timezone.now())
+        self.assertUsesIndexes(TimeLog.objects.filter(task=self.task, end_time__isnull=True))
+        self.assertUsesIndexes(TimeLog.objects.filter(task=self.task, start_time__range=window))
+        self.assertUsesIndexes(TimeLog.objects.filter(user=self.user, start_time__range=window))
+        self.assertUsesIndexes(UserDailyDuration.objects.filter(user=self.user, day__gte=window[0].date()))
+
+
+@override_settings(**BENCHMARK_SETTINGS)
+class EndpointBenchmarkTestCase(APITestCase):
+    def test_every_action_is_measured(self):
+        user = seed_dataset(20, users=3)
+        self.assertEqual(Task.objects.count(), 20)
+        self.assertEqual(TimeLog.objects.count(), 40)
+        report = run_endpoint_benchmarks(user, runs=2)
+        self.assertEqual(set(report), {'list', 'retrieve', 'my', 'created', 'completed', 'top', 'comments',
+                                       'time_logs', 'stop', 'time_logged_last_month'})
+        for result in report.values():
+            self.assertEqual(set(result), {'queries', 'p50', 'p95', 'p99', 'peak_memory_kb'})
+            self.assertGreater(result['queries'], 0)
+
+    def test_compare_reports_flags_regressions(self):
+        result = {'queries': 2, 'p50': 10, 'p95': 20, 'p99': 30, 'peak_memory_kb': 100}
+        baseline = {'datasets': {'25000': {'actions': {'my': result}}}}
+        report = {'datasets': {'25000': {'actions': {'my': {**result, 'queries': 3, 'p95': 23}}}}}
+        self.assertEqual(compare_reports(report, baseline), ['25000 my: queries 2 -> 3'])
+        report['datasets']['25000']['actions']['my']['p99'] = 40
+        self.assertEqual(compare_reports(report, baseline), ['25000 my: queries 2 -> 3', '25000 my: p99 30 -> 40'])
+
+
+class RandomDataTestCase(APITestCase):
+    def create_random_data(self, *args):
+        call_command('create_random_data', '--tasks', '30', '--users', '3', '--batch-size', '7', *args,
+                     stdout=StringIO())
+
+    def test_generation_is_deterministic(self):
+        self.create_random_data('--seed', '5')
+        first = list(TimeLog.objects.order_by('id').values_list('task_id', 'user_id', 'start_time', 'duration'))
+        self.assertEqual((Task.objects.count(), len(first), Comment.objects.count()), (30, 60, 30))
+
+        cache.set('stale', 1)
+        self.create_random_data('--seed', '5', '--clear', '--noinput')
+        self.assertIsNone(cache.get('stale'))
+        self.assertFalse(Tombstone.objects.exists())
+        self.assertEqual(
+            list(TimeLog.objects.order_by('id').values_list('task_id', 'user_id', 'start_time', 'duration')), first)
+        call_command('rebuild_rollups', '--verify', stdout=StringIO())
+
+    def test_existing_data_is_kept_unless_confirmed(self):
+        self.create_random_data()
+        self.create_random_data()
+        self.assertEqual(Task.objects.count(), 60)
+        with mock.patch('builtins.input', return_value='no'):
+            self.create_random_data('--clear')
+        self.assertEqual(Task.objects.count(), 60)
+
+
+class TaskDetailCacheTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        self.assignee = User.objects.create_user(username='assignee@example.com', email='assignee@example.com',
+                                                 password='testpassword')
+        self.task = Task.objects.create(user=self.user, title="string", description="string", owner=self.user)
+        self.url = reverse('task-detail', args=[self.task.pk])
+        self.client.force_authenticate(user=self.user)
+
+    def test_retrieve_is_served_from_cache(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data, {'id': self.task.pk, 'title': 'string', 'description': 'string',
+                                         'status': 'todo', 'owner': self.user.pk})
+        self.assertEqual(cache_stats()['task-detail'], {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_writes_invalidate_the_cached_task(self):
+        self.client.get(self.url)
+        self.client.patch(reverse('task-complete', args=[self.task.pk]))
+        self.assertEqual(self.client.get(self.url).data['status'], 'done')
+
+        self.client.post(reverse('task-assign', args=[self.task.pk]), {'user': self.assignee.pk}, format='json')
+        self.assertEqual(self.client.get(self.url).data['owner'], self.assignee.pk)
+
+        self.client.patch(reverse('task-bulk-update'), [{'id': self.task.pk, 'title': 'Renamed'}], format='json')
+        self.assertEqual(self.client.get(self.url).data['title'], 'Renamed')
+
+        self.client.post(reverse('task-bulk-assign'), {'ids': [self.task.pk], 'user': self.user.pk}, format='json')
+        self.assertEqual(self.client.get(self.url).data['owner'], self.user.pk)
+
+        self.client.post(reverse('timer-list'), {'task': self.task.pk}, format='json')
+        self.assertEqual(self.client.get(self.url).data['status'], 'in_progress')
+
+        self.client.patch(reverse('task-bulk-complete'), {'ids': [self.task.pk]}, format='json')
+        self.assertEqual(self.client.get(self.url).data['status'], 'done')
+
+        self.client.delete(self.url)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_ids_share_one_entry_and_missing_tasks_leave_no_keys(self):
+        padded_url = reverse('task-detail', args=[f'0{self.task.pk}'])
+        self.assertEqual(self.client.get(padded_url).data['status'], 'todo')
+        self.client.patch(reverse('task-complete', args=[self.task.pk]))
+        self.assertEqual(self.client.get(padded_url).data['status'], 'done')
+
+        self.assertEqual(self.client.get(reverse('task-detail', args=[1000000])).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertIsNone(cache.get(get_version_key(1000000)))
+        self.assertEqual(self.client.get(reverse('task-detail', args=['abc'])).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+
+class TopTasksCacheTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        self.other_user = User.objects.create_user(username='other@example.com', email='other@example.com',
+                                                   password='testpassword')
+        self.task = Task.objects.create(user=self.user, title="mine", description="string", owner=self.user)
+        self.other_task = Task.objects.create(user=self.other_user, title="theirs", description="string",
+                                              owner=self.other_user)
+        TimeLog.objects.create(task=self.task, user=self.user, end_time=timezone.now(), duration=30)
+        TimeLog.objects.create(task=self.other_task, user=self.other_user, end_time=timezone.now(), duration=40)
+
+    def get_top(self, user):
+        self.client.force_authenticate(user=user)
+        return self.client.get(reverse('task-top')).data
+
+    def test_top_is_cached_per_user(self):
+        self.assertEqual([task['title'] for task in self.get_top(self.user)], ['mine'])
+        self.assertEqual([task['title'] for task in self.get_top(self.other_user)], ['theirs'])
+        self.client.force_authenticate(user=self.user)
+        with self.assertNumQueries(0):
+            self.client.get(reverse('task-top'))
+
+    def test_new_time_log_invalidates_owner_entry(self):
+        self.get_top(self.user)
+        self.get_top(self.other_user)
+        TimeLog.objects.create(task=self.task, user=self.other_user, end_time=timezone.now(), duration=15)
+        self.assertEqual(self.get_top(self.user)[0]['total_duration'], 45)
+        self.client.force_authenticate(user=self.other_user)
+        with self.assertNumQueries(0):
+            self.client.get(reverse('task-top'))
+
+    def test_stale_entry_is_served_while_another_worker_recomputes(self):
+        self.get_top(self.user)
+        entry_key = top_tasks_cache.get_entry_key(self.user.pk)
+        cache.set(entry_key, {**cache.get(entry_key), 'fresh_until': 0})
+        cache.add(top_tasks_cache.get_lock_key(self.user.pk), 1)
+        self.client.force_authenticate(user=self.user)
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('task-top'))
+        self.assertEqual(response.data[0]['total_duration'], 30)
+
+        cache.delete(top_tasks_cache.get_lock_key(self.user.pk))
+        TimeLog.objects.create(task=self.task, user=self.user, end_time=timezone.now(), duration=15)
+        self.assertEqual(self.get_top(self.user)[0]['total_duration'], 45)
+
+
+class DashboardTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        self.other_user = User.objects.create_user(username='other@example.com', email='other@example.com',
+                                                   password='testpassword')
+        self.mine = Task.objects.create(user=self.other_user, title="mine", description="string", owner=self.user)
+        self.created = Task.objects.create(user=self.user, title="created", description="string",
+                                           owner=self.other_user)
+        for title in ["first", "second"]:
+            task = Task.objects.create(user=self.user, title=title, description="string", owner=self.user)
+            TimeLog.objects.create(task=task, user=self.user, end_time=timezone.now(), duration=30)
+        self.client.force_authenticate(user=self.user)
+
+    def test_dashboard_sections(self):
+        response = self.client.get(reverse('task-dashboard'), {'created_limit': 1, 'top_limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([task['title'] for task in response.data['my']], ['mine', 'first', 'second'])
+        self.assertEqual([task['title'] for task in response.data['created']], ['created'])
+        self.assertEqual(len(response.data['top']), 1)
+        self.assertEqual(response.data['time_logged']['total_time_logged'], 60)
+        self.assertEqual(response.data['time_logged']['to'], timezone.localdate())
+
+    def test_dashboard_shares_the_top_cache(self):
+        self.client.get(reverse('task-top'))
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('task-dashboard'))
+        self.assertEqual([task['title'] for task in response.data['top']], ['first', 'second'])
+
+    def test_dashboard_validates_limits(self):
+        response = self.client.get(reverse('task-dashboard'), {'my_limit': 101})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(CONCURRENT_SECTIONS_WORKERS=4)
+class ConcurrentDashboardTestCase(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        task = Task.objects.create(user=self.user, title="string", description="string", owner=self.user)
+        TimeLog.objects.create(task=task, user=self.user, end_time=timezone.now(), duration=30)
+        self.client.force_authenticate(user=self.user)
+
+    def test_sections_run_in_the_thread_pool(self):
+        thread_name = lambda *args: threading.current_thread().name
+        with mock.patch('apps.tasks.views.get_time_logged', side_effect=thread_name):
+            response = self.client.get(reverse('task-dashboard'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['time_logged']['total_time_logged'].startswith('sections'))
+        self.assertEqual([task['title'] for task in response.data['my']], ['string'])
+        self.assertEqual(response.data['top'][0]['total_duration'], 30)
+
+
+class ValuesSerializerTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        self.task = Task.objects.create(user=self.user, title="Задача", description="", owner=self.user)
+        Comment.objects.create(task=self.task, user=self.user, text="Комментарий")
+        TimeLog.objects.create(task=self.task, user=self.user, end_time=timezone.now(), duration=0)
+        TimeLog.objects.create(task=self.task, user=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def assertSameOutput(self, serializer_class, queryset):
+        values_serializer = ValuesSerializer(serializer_class)
+        self.assertEqual(values_serializer.render(values_serializer.get_queryset(queryset)),
+                         serializer_class(queryset, many=True).data)
+
+    def test_output_matches_the_serializers(self):
+        for time_zone in ['UTC', 'Asia/Kolkata']:
+            with timezone.override(time_zone):
+                self.assertSameOutput(TaskListSerializer, Task.objects.order_by('id'))
+                self.assertSameOutput(AllCommentSerializer, Comment.objects.order_by('id'))
+                self.assertSameOutput(TimeLogSerializer, TimeLog.objects.order_by('id'))
+
+    def test_unsupported_fields_are_rejected(self):
+        class StatusSerializer(serializers.ModelSerializer):
+            class Meta:
+                model = Task
+                fields = ("id", "status")
+
+        with self.assertRaises(ImproperlyConfigured):
+            ValuesSerializer(StatusSerializer)
+
+    def test_list_endpoints_use_values(self):
+        expected = TimeLogSerializer(TimeLog.objects.order_by('id'), many=True).data
+        response = self.client.get(reverse('task-time-logs', args=[self.task.pk]))
+        self.assertEqual(response.data['results'], expected)
+        response = self.client.get(reverse('task-my'), {'pagination': 'cursor', 'page_size': 1})
+        self.assertEqual(response.data['results'], TaskListSerializer(Task.objects.all(), many=True).data)
+        self.assertIsNone(response.data['next'])
+        response = self.client.get(reverse('comments-list'), {'pagination': 'cursor'})
+        self.assertEqual(response.data['results'][0]['text'], 'Комментарий')
+
+    def test_benchmark_compares_both_paths(self):
+        report = run_serializer_benchmarks(sizes=[1, 10], runs=2)
+        self.assertEqual(set(report), {'tasks', 'comments', 'time_logs'})
+        self.assertEqual(set(report['time_logs'][10]), {'drf', 'values'})
+
+
+class ConditionalGetTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        self.other_user = User.objects.create_user(username='other@example.com', email='other@example.com',
+                                                   password='testpassword')
+        self.task = Task.objects.create(user=self.user, title="string", description="string", owner=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def assertNotModified(self, url, etag, **params):
+        with self.assertNumQueries(0):
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response['Cache-Control'], 'private')
+        self.assertIn('Authorization', response['Vary'])
+
+    def assertModified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        return response['ETag']
+
+    def test_etags_differ_between_users(self):
+        url = reverse('task-my')
+        response = self.client.get(url)
+        self.assertEqual(response['Cache-Control'], 'private')
+        self.assertIn('Authorization', response['Vary'])
+        # The same counter value for both users, as two time based initial values can be.
+        with mock.patch('apps.common.cache.ChangeCounter.get', return_value=1):
+            etag = self.client.get(url)['ETag']
+            self.client.force_authenticate(user=self.other_user)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_my_tasks(self):
+        url = reverse('task-my')
+        etag = self.client.get(url)['ETag']
+        self.assertNotModified(url, etag)
+        self.assertNotEqual(self.client.get(url, {'page': 1})['ETag'], etag)
+
+        Task.objects.create(user=self.user, title="new", description="string", owner=self.user)
+        etag = self.assertModified(url, etag)
+        TimeLog.objects.create(task=self.task, user=self.user, end_time=timezone.now(), duration=5)
+        etag = self.assertModified(url, etag)
+        self.client.post(reverse('task-bulk-assign'), {'ids': [self.task.pk], 'user': self.other_user.pk},
+                         format='json')
+        etag = self.assertModified(url, etag)
+        self.client.patch(reverse('task-bulk-complete'), {'ids': [self.task.pk]}, format='json')
+        self.client.post(reverse('task-bulk-create'), [{'title': 'bulk', 'description': 'string'}], format='json')
+        etag = self.assertModified(url, etag)
+        self.assertNotModified(url, etag)
+
+    def test_comments(self):
+        url = reverse('task-comments', args=[self.task.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertNotModified(url, etag)
+        self.client.post(reverse('comments-list'), {'task': self.task.pk, 'text': 'text'}, format='json')
+        etag = self.assertModified(url, etag)
+        self.client.delete(reverse('comments-detail', args=[Comment.objects.get().pk]))
+        self.assertModified(url, etag)
+
+    def test_time_logs(self):
+        url = reverse('task-time-logs', args=[self.task.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertNotModified(url, etag)
+        self.client.post(reverse('timer-list'), {'task': self.task.pk}, format='json')
+        etag = self.assertModified(url, etag)
+        # Stopped within the same minute, only end_time changes.
+        self.client.post(reverse('timer-stop'), {'task': self.task.pk}, format='json')
+        etag = self.assertModified(url, etag)
+        self.client.post(reverse('timer-bulk'), [{'task': self.task.pk, 'start_time': '2023-01-01T10:00:00Z',
+                                                  'duration': 10}], format='json')
+        self.assertModified(url, etag)
+
+
+class CommentThreadTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        self.task = Task.objects.create(user=self.user, title="first", description="string", owner=self.user)
+        self.other_task = Task.objects.create(user=self.user, title="second", description="string", owner=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def get_comment_counts(self):
+        return {task['title']: task['comment_count'] for task in self.client.get(reverse('task-my')).data['results']}
+
+    def test_comment_count_is_maintained(self):
+        for text in ["one", "two"]:
+            self.client.post(reverse('comments-list'), {'task': self.task.pk, 'text': text}, format='json')
+        self.assertEqual(self.get_comment_counts(), {'first': 2, 'second': 0})
+
+        comment = Comment.objects.filter(task=self.task).first()
+        self.client.patch(reverse('comments-detail', args=[comment.pk]), {'task': self.other_task.pk}, format='json')
+        self.assertEqual(self.get_comment_counts(), {'first': 1, 'second': 1})
+
+        self.client.delete(reverse('comments-detail', args=[comment.pk]))
+        self.assertEqual(self.get_comment_counts(), {'first': 1, 'second': 0})
+        call_command('rebuild_rollups', verify=True, stdout=StringIO())
+
+    def test_since_id(self):
+        comments = [Comment.objects.create(task=self.task, user=self.user, text=str(index)) for index in range(3)]
+        Comment.objects.create(task=self.other_task, user=self.user, text="other")
+        url = reverse('task-comments', args=[self.task.pk])
+        response = self.client.get(url, {'since_id': comments[0].pk})
+        self.assertEqual([comment['text'] for comment in response.data['results']], ['1', '2'])
+        response = self.client.get(url, {'since_id': comments[-1].pk})
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(self.client.get(url, {'since_id': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class DeltaSyncTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        self.other_user = User.objects.create_user(username='other@example.com', email='other@example.com',
+                                                   password='testpassword')
+        self.task = Task.objects.create(user=self.user, title="mine", description="string", owner=self.user)
+        self.comment = Comment.objects.create(task=self.task, user=self.user, text="text")
+        self.time_log = TimeLog.objects.create(task=self.task, user=self.user, end_time=timezone.now(), duration=5)
+        self.other_task = Task.objects.create(user=self.other_user, title="theirs", description="string",
+                                              owner=self.other_user)
+        Comment.objects.create(task=self.other_task, user=self.other_user, text="text")
+
+    def sync(self, user, token=None, **params):
+        self.client.force_authenticate(user=user)
+        if token:
+            params['sync_token'] = token
+        response = self.client.get(reverse('task-changes'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data
+
+    def test_full_and_delta_sync(self):
+        data = self.sync(self.user)
+        self.assertEqual([task['id'] for task in data['tasks']], [self.task.pk])
+        self.assertEqual([comment['id'] for comment in data['comments']], [self.comment.pk])
+        self.assertEqual([time_log['id'] for time_log in data['time_logs']], [self.time_log.pk])
+        self.assertEqual(data['deleted'], [])
+        self.assertFalse(data['has_more'])
+
+        data = self.sync(self.user, data['sync_token'])
+        self.assertEqual((data['tasks'], data['comments'], data['time_logs']), ([], [], []))
+
+        self.client.patch(reverse('task-bulk-complete'), {'ids': [self.task.pk]}, format='json')
+        self.client.delete(reverse('comments-detail', args=[self.comment.pk]))
+        data = self.sync(self.user, data['sync_token'])
+        self.assertEqual([(task['id'], task['status']) for task in data['tasks']], [(self.task.pk, 'done')])
+        self.assertEqual([(row['kind'], row['id']) for row in data['deleted']], [('comment', self.comment.pk)])
+
+        self.client.delete(reverse('task-detail', args=[self.task.pk]))
+        data = self.sync(self.user, data['sync_token'])
+        self.assertEqual({(row['kind'], row['id']) for row in data['deleted']},
+                         {('task', self.task.pk), ('time_log', self.time_log.pk)})
+
+    def test_batches_are_bounded(self):
+        for index in range(4):
+            Task.objects.create(user=self.user, title=str(index), description="string", owner=self.user)
+        seen, token, has_more = [], None, True
+        while has_more:
+            data = self.sync(self.user, token, limit=2)
+            self.assertLessEqual(len(data['tasks']), 2)
+            seen += [task['id'] for task in data['tasks']]
+            token, has_more = data['sync_token'], data['has_more']
+        self.assertEqual(sorted(seen), sorted(Task.objects.filter(user=self.user).values_list('id', flat=True)))
+
+    def test_reassigned_tasks_move_between_users(self):
+        token = self.sync(self.user)['sync_token']
+        other_token = self.sync(self.other_user)['sync_token']
+        self.client.post(reverse('task-bulk-assign'), {'ids': [self.task.pk], 'user': self.other_user.pk},
+                         format='json')
+
+        # Still the creator, so the task stays in the old owner's data.
+        data = self.sync(self.user, token)
+        self.assertEqual([task['owner'] for task in data['tasks']], [self.other_user.pk])
+        self.assertEqual(data['deleted'], [])
+
+        data = self.sync(self.other_user, other_token)
+        self.assertEqual([task['id'] for task in data['tasks']], [self.task.pk])
+        self.assertEqual([comment['id'] for comment in data['comments']], [self.comment.pk])
+        self.assertEqual([time_log['id'] for time_log in data['time_logs']], [self.time_log.pk])
+
+        other_token = data['sync_token']
+        task = Task.objects.get(pk=self.task.pk)
+        task.owner = self.user
+        task.save()
+        data = self.sync(self.other_user, other_token)
+        self.assertEqual([(row['kind'], row['id']) for row in data['deleted']], [('task', self.task.pk)])
+
+    def test_recent_changes_wait_for_the_settle_window(self):
+        token = self.sync(self.user)['sync_token']
+        Task.objects.create(user=self.user, title="new", description="string", owner=self.user)
+        with self.settings(SYNC_SETTLE_SECONDS=60):
+            self.assertEqual(self.sync(self.user, token)['tasks'], [])
+        self.assertEqual([task['title'] for task in self.sync(self.user, token)['tasks']], ['new'])
+
+    def test_cursors_stay_before_open_transactions(self):
+        token = self.sync(self.user)['sync_token']
+        # Written by a transaction that started a minute ago and has not committed yet.
+        started = timezone.now() - relativedelta(minutes=1)
+        Task.objects.filter(pk=self.task.pk).update(updated_at=started + relativedelta(seconds=1))
+        with mock.patch('apps.tasks.sync.get_oldest_write_start', return_value=started):
+            data = self.sync(self.user, token)
+        self.assertEqual(data['tasks'], [])
+        data = self.sync(self.user, data['sync_token'])
+        self.assertEqual([task['id'] for task in data['tasks']], [self.task.pk])
+
+    def test_invalid_and_expired_tokens(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('task-changes'), {'sync_token': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        expired = timezone.now() - relativedelta(days=365)
+        token = encode_sync_token({kind: (expired, 0) for kind in ['tasks', 'comments', 'time_logs', 'deleted']})
+        response = self.client.get(reverse('task-changes'), {'sync_token': token})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    def test_purge_tombstones(self):
+        Tombstone.objects.create(kind=Tombstone.Kind.TASK, object_id=1, owner=self.user,
+                                 deleted_at=timezone.now() - relativedelta(days=365))
+        Tombstone.objects.create(kind=Tombstone.Kind.TASK, object_id=2, owner=self.user)
+        call_command('purge_tombstones', stdout=StringIO())
+        self.assertEqual(list(Tombstone.objects.values_list('object_id', flat=True)), [2])
+
+
+@override_settings(EVENTS_CHANNEL_LAYER={"BACKEND": "apps.common.events.InMemoryChannelLayer"})
+class ServerEventsTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        self.other_user = User.objects.create_user(username='other@example.com', email='other@example.com',
+                                                   password='testpassword')
+        self.task = Task.objects.create(user=self.user, title="first", description="string", owner=self.user)
+        self.client.force_authenticate(user=self.user)
+        self.subscriptions = {
+            user.pk: get_channel_layer().subscribe(get_user_group(user.pk)) for user in (self.user, self.other_user)
+        }
+        for subscription in self.subscriptions.values():
+            self.addCleanup(async_to_sync(subscription.close))
+
+    def get_events(self, user):
+        events = []
+        while (message := async_to_sync(self.subscriptions[user.pk].get)(timeout=0.01)) is not None:
+            events.append(json.loads(message))
+        return events
+
+    def test_timer_events(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('timer-list'), {'task': self.task.pk}, format='json')
+        time_log = TimeLog.objects.get()
+        self.assertEqual([(event['type'], event['data']['time_log']) for event in self.get_events(self.user)],
+                         [('timer.started', time_log.pk)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('timer-stop'), {'task': self.task.pk}, format='json')
+        [event] = self.get_events(self.user)
+        self.assertEqual(event, {'type': 'timer.stopped',
+                                 'data': {'task': self.task.pk, 'time_log': time_log.pk, 'duration': 0}})
+        self.assertEqual(self.get_events(self.other_user), [])
+
+    def test_task_events(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('task-assign', args=[self.task.pk]), {'user': self.other_user.pk}, format='json')
+        expected = {'type': 'task.assigned',
+                    'data': {'task': self.task.pk, 'owner': self.other_user.pk, 'previous_owner': self.user.pk}}
+        self.assertEqual(self.get_events(self.user), [expected])
+        self.assertEqual(self.get_events(self.other_user), [expected])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('task-complete', args=[self.task.pk]))
+        completed = {'type': 'task.completed', 'data': {'task': self.task.pk}}
+        self.assertEqual(self.get_events(self.user), [completed])
+        self.assertEqual(self.get_events(self.other_user), [completed])
+
+    def test_comment_event(self):
+        self.client.force_authenticate(user=self.other_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('comments-list'), {'task': self.task.pk, 'text': 'hello'}, format='json')
+        comment = Comment.objects.get()
+        data = {'task': self.task.pk, 'comment': comment.pk, 'user': self.other_user.pk}
+        self.assertEqual(self.get_events(self.user), [{'type': 'comment.created', 'data': data}])
+        self.assertEqual(self.get_events(self.other_user), [])
+
+    def test_rolled_back_changes_are_not_published(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks, \
+                mock.patch('apps.tasks.views.send_notification', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.patch(reverse('task-complete', args=[self.task.pk]))
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.get_events(self.user), [])
+
+
+class AtomicTimerTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        self.task = Task.objects.create(user=self.user, title="string", description="string", owner=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def get_time_log_queries(self, context):
+        return [query['sql'].split()[0] for query in context.captured_queries if 'tasks_timelog' in query['sql']]
+
+    def test_start_and_stop_are_single_statements(self):
+        # The task lookup, the INSERT and the task status UPDATE, in a savepoint.
+        with self.assertNumQueries(5), CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse('timer-list'), {'task': self.task.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.get_time_log_queries(context), ['INSERT'])
+        self.assertEqual(Task.objects.get(pk=self.task.pk).status, Task.Status.IN_PROGRESS)
+
+        response = self.client.post(reverse('timer-list'), {'task': self.task.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'task': ['A timer is already running for this task']})
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse('timer-stop'), {'task': self.task.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_time_log_queries(context), ['UPDATE'])
+
+        response = self.client.post(reverse('timer-stop'), {'task': self.task.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'task': ['No running timer found for this task']})
+
+    def test_duration_spans_days(self):
+        start_time = timezone.now() - timedelta(days=2, hours=3, minutes=5, seconds=30)
+        time_log = TimeLog.objects.create(task=self.task, user=self.user, start_time=start_time)
+        self.client.post(reverse('timer-stop'), {'task': self.task.pk}, format='json')
+
+        time_log.refresh_from_db()
+        self.assertEqual(time_log.duration, 2 * 24 * 60 + 3 * 60 + 5)
+        self.assertGreaterEqual(time_log.end_time - start_time, timedelta(days=2, hours=3, minutes=5, seconds=30))
+        self.assertGreater(time_log.updated_at, start_time)
+        self.assertEqual(Task.objects.get(pk=self.task.pk).total_duration, time_log.duration)
+        call_command('rebuild_rollups', verify=True, stdout=StringIO())
+
+    def test_databases_without_returning_use_the_orm(self):
+        with mock.patch('apps.tasks.timers.supports_returning', return_value=False):
+            response = self.client.post(reverse('timer-list'), {'task': self.task.pk}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(Task.objects.get(pk=self.task.pk).status, Task.Status.IN_PROGRESS)
+            response = self.client.post(reverse('timer-list'), {'task': self.task.pk}, format='json')
+            self.assertEqual(response.data, {'task': ['A timer is already running for this task']})
+
+            TimeLog.objects.filter(task=self.task).update(start_time=timezone.now() - timedelta(days=1, minutes=5))
+            response = self.client.post(reverse('timer-stop'), {'task': self.task.pk}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(TimeLog.objects.get(task=self.task).duration, 24 * 60 + 5)
+            response = self.client.post(reverse('timer-stop'), {'task': self.task.pk}, format='json')
+            self.assertEqual(response.data, {'task': ['No running timer found for this task']})
+        call_command('rebuild_rollups', verify=True, stdout=StringIO())
+
+    def test_manual_open_time_log_logs_nothing_until_stopped(self):
+        response = self.client.post(reverse('timer-add-time-log-manually'), {
+            'task': self.task.pk, 'start_time': timezone.now() - timedelta(minutes=10), 'end_time': None,
+            'duration': 60,
+        }, format='json')
+        self.assertEqual(response.data['duration'], 0)
+        self.client.post(reverse('timer-stop'), {'task': self.task.pk}, format='json')
+        self.assertEqual(Task.objects.get(pk=self.task.pk).total_duration, 10)
+        call_command('rebuild_rollups', verify=True, stdout=StringIO())
+
+    def test_concurrent_manual_open_time_log_is_rejected(self):
+        serializer = TimeLogSerializer(data={'task': self.task.pk, 'start_time': timezone.now(), 'end_time': None,
+                                             'duration': 0})
+        serializer.is_valid(raise_exception=True)
+        # Opened by another request between validation and the INSERT.
+        TimeLog.objects.create(task=self.task, user=self.user)
+        with self.assertRaises(ValidationError) as context:
+            serializer.save(user=self.user)
+        self.assertIn("A timer is already running for this task", str(context.exception))
+        self.assertEqual(TimeLog.objects.count(), 1)
+
+
+class ConcurrentTimerTestCase(TransactionTestCase):
+    threads = 8
+    rounds = 5
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            # Shared-cache in-memory databases fail concurrent writers instead of making them wait.
+            self.skipTest("needs a test database that supports concurrent writers")
+        cache.clear()
+        self.user = User.objects.create_user(username='owner@example.com', email='owner@example.com',
+                                             password='testpassword')
+        self.task = Task.objects.create(user=self.user, title="string", description="string", owner=self.user)
+
+    def hammer(self, url):
+        """Post to ``url`` from every thread at once, returns the status codes."""
+        barrier = threading.Barrier(self.threads)
+        codes = []
+
+        def post():
+            client = APIClient()
+            client.force_authenticate(user=self.user)
+            try:
+                barrier.wait()
+                codes.append(client.post(url, {'task': self.task.pk}, format='json').status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=post) for _ in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(codes)
+
+    def test_one_start_and_one_stop_win(self):
+        for _ in range(self.rounds):
+            self.assertEqual(self.hammer(reverse('timer-list')),
+                             [status.HTTP_201_CREATED] + [status.HTTP_400_BAD_REQUEST] * (self.threads - 1))
+            self.assertEqual(TimeLog.objects.filter(end_time__isnull=True).count(), 1)
+            self.assertEqual(self.hammer(reverse('timer-stop')),
+                             [status.HTTP_200_OK] + [status.HTTP_400_BAD_REQUEST] * (self.threads - 1))
+        self.assertEqual(TimeLog.objects.filter(end_time__isnull=False).count(), self.rounds)
+        call_command('rebuild_rollups', verify=True, stdout=StringIO())
@@ -0,0 +1,111 @@
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from apps.tasks.caching import invalidate_tasks, owner_tasks_changes, task_time_logs_changes, top_tasks_cache
+from apps.tasks.models import Task, TimeLog, TimeLogState
+from apps.tasks.signals import time_logs_changed
+
+# Whole minutes between the %s parameter and start_time, floored and never negative.
+DURATION_SQL = {
+    "postgresql": "GREATEST(FLOOR(EXTRACT(EPOCH FROM (%s - {start_time})) / 60), 0)::integer",
+    "sqlite": "MAX(CAST(ROUND((julianday(%s) - julianday({start_time})) * 86400000) AS INTEGER) / 60000, 0)",
+}
+
+
+def supports_returning():
+    """Whether the database runs the single-statement timers, SQLite has RETURNING since 3.35."""
+    if connection.vendor == "sqlite":
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return connection.vendor in DURATION_SQL
+
+
+def get_columns(*fields):
+    quote_name = connection.ops.quote_name
+    return {field: quote_name(TimeLog._meta.get_field(field).column) for field in fields}
+
+
+def start_timer(task, user):
+    """
+    Open a timer on ``task`` with one INSERT that yields to the running timer of the task, if there
+    is one, through the timelog_one_open_per_task constraint. Returns the new TimeLog, or None when
+    a timer was already running.
+    """
+    if not supports_returning():
+        return start_timer_orm(task, user)
+    columns = get_columns("id", "task", "user", "start_time", "end_time", "duration", "updated_at")
+    now = timezone.now()
+    sql = (
+        f"INSERT INTO {connection.ops.quote_name(TimeLog._meta.db_table)} "
+        f"({columns['task']}, {columns['user']}, {columns['start_time']}, {columns['duration']}, "
+        f"{columns['updated_at']}) VALUES (%s, %s, %s, 0, %s) "
+        f"ON CONFLICT ({columns['task']}) WHERE {columns['end_time']} IS NULL DO NOTHING "
+        f"RETURNING {', '.join(columns.values())}"
+    )
+    with transaction.atomic():
+        time_log = next(iter(TimeLog.objects.raw(sql, [task.pk, user.pk, now, now])), None)
+        if time_log is None:
+            return None
+        # A running timer logs no duration, no rollup changes, only the task's time_logs list does.
+        task_time_logs_changes.bump([task.pk])
+        set_in_progress(task, now)
+    return time_log
+
+
+def start_timer_orm(task, user):
+    """start_timer() for databases without RETURNING, the constraint still decides concurrent starts."""
+    now = timezone.now()
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                time_log = TimeLog.objects.create(task=task, user=user, start_time=now, duration=0)
+        except IntegrityError:
+            return None
+        set_in_progress(task, now)
+    return time_log
+
+
+def set_in_progress(task, now):
+    if Task.objects.filter(pk=task.pk).exclude(status=Task.Status.IN_PROGRESS).update(
+            status=Task.Status.IN_PROGRESS, updated_at=now):
+        top_tasks_cache.invalidate({task.owner_id} - {None})
+        owner_tasks_changes.bump([task.owner_id])
+        invalidate_tasks([task.pk])
+
+
+def stop_timer(task):
+    """
+    Close the running timer of ``task`` with one UPDATE that computes the duration in the database.
+    Returns the stopped TimeLog, or None when no timer was running.
+    """
+    if not supports_returning():
+        return stop_timer_orm(task)
+    columns = get_columns("id", "task", "user", "start_time", "end_time", "duration", "updated_at")
+    duration = DURATION_SQL[connection.vendor].format(start_time=columns["start_time"])
+    now = timezone.now()
+    sql = (
+        f"UPDATE {connection.ops.quote_name(TimeLog._meta.db_table)} "
+        f"SET {columns['end_time']} = %s, {columns['duration']} = {duration}, {columns['updated_at']} = %s "
+        f"WHERE {columns['task']} = %s AND {columns['end_time']} IS NULL "
+        f"RETURNING {', '.join(columns.values())}"
+    )
+    with transaction.atomic():
+        time_log = next(iter(TimeLog.objects.raw(sql, [now, now, now, task.pk])), None)
+        if time_log is None:
+            return None
+        # Running timers log nothing, their whole duration is added now.
+        removed = TimeLogState(time_log.task_id, time_log.user_id, time_log.start_time, 0)
+        time_logs_changed.send(sender=TimeLog, removed=[removed], added=[time_log.get_state()])
+    return time_log
+
+
+def stop_timer_orm(task):
+    """stop_timer() for databases without RETURNING, the running timer is locked until it is saved."""
+    now = timezone.now()
+    with transaction.atomic():
+        time_log = TimeLog.objects.select_for_update().filter(task=task, end_time__isnull=True).first()
+        if time_log is None:
+            return None
+        time_log.end_time = now
+        time_log.duration = max(int((now - time_log.start_time).total_seconds()) // 60, 0)
+        time_log.save()
+    return time_log
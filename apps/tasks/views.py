@@ -1,66 +1,136 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+
 from dateutil.relativedelta import relativedelta
-from django.db.models import Sum, Subquery, OuterRef
+from django.db import transaction
+from django.db.models import Sum
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema, no_body
 from rest_framework import filters
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.core.cache import cache
 
 
-from apps.common.helpers import send_notification
-from apps.tasks.models import Task, Comment, TimeLog
+from apps.common.concurrency import run_concurrently
+from apps.common.events import publish_event
+from apps.common.helpers import send_notification, send_notifications
+from apps.common.metrics import SerializerTimingMixin
+from apps.common.parsers import NDJSONParser, ORJSONParser
+from apps.common.serializers import ValuesListMixin
+from apps.common.views import ConditionalListMixin
+from apps.tasks.caching import get_cached_task_detail, invalidate_tasks, owner_tasks_changes, \
+    task_comments_changes, task_time_logs_changes, top_tasks_cache
+from apps.tasks.models import Task, Comment, TaskDailyDuration, TimeLog, UserDailyDuration
 from apps.tasks.serializers import TaskSerializer, TaskListSerializer, ShortTaskSerializer, \
     CreateCommentSerializer, AllCommentSerializer, TaskAssignSerializer, CreateTimeLogSerializer,\
-    TimeLogSerializer, StopTimeLogSerializer
+    TimeLogSerializer, StopTimeLogSerializer, TopTaskSerializer, DateRangeSerializer, BulkTimeLogSerializer, \
+    DashboardSerializer, BulkTaskIdsSerializer, BulkTaskAssignSerializer, BulkTaskUpdateSerializer, \
+    TaskExportSerializer, TimeLogExportSerializer, CommentSinceSerializer, SyncSerializer, TaskSyncSerializer, \
+    CommentSyncSerializer, TimeLogSyncSerializer, TombstoneSerializer
+from apps.tasks.exports import export_response, TASK_EXPORT_FIELDS, TIME_LOG_EXPORT_FIELDS
+from apps.tasks.search import search_tasks, search_comments
+from apps.tasks.signals import time_logs_changed
+from apps.tasks.sync import encode_sync_token, get_changes, record_reassignments, touch_task_rows
+
+search_query_parameter = openapi.Parameter("q", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True)
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def get_top_tasks(queryset, user):
+    """Tasks owned by ``user`` with the minutes logged on them during the last month."""
+    today = timezone.localdate()
+    return queryset.filter(
+        owner=user,
+        daily_durations__owner=user,
+        daily_durations__day__range=(today - relativedelta(months=1), today),
+    ).annotate(last_month_duration=Sum('daily_durations__duration'))
+
+
+def get_time_logged(user, date_from, date_to):
+    return UserDailyDuration.objects.filter(
+        user=user,
+        day__range=(date_from, date_to),
+    ).aggregate(total=Sum('duration')).get('total')
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+def get_since_id(request):
+    serializer = CommentSinceSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data.get("since_id")
+
+
+def get_search_query(request):
+    query = request.query_params.get("q", "").strip()
+    if not query:
+        raise ValidationError({"q": "This query parameter is required."})
+    return query
+
+
+class TaskViewSet(SerializerTimingMixin, ConditionalListMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ["title"]
     ordering = ('id')
+    values_list_actions = ("list", "my", "created", "completed", "search", "comments", "time_logs")
+    bulk_batch_size = 1000
 
     def get_serializer_class(self):
         if self.action == "retrieve":
             return ShortTaskSerializer
         if self.action == "comments":
             return AllCommentSerializer
-        if self.action in ["list", "top", "my", "created", "completed"]:
+        if self.action in ["list", "my", "created", "completed", "search"]:
             return TaskListSerializer
+        if self.action == "top":
+            return TopTaskSerializer
         if self.action == "assign":
             return TaskAssignSerializer
         if self.action == "time_logs":
             return TimeLogSerializer
         return super().get_serializer_class()
 
+    def get_list_version(self):
+        if self.action == "my":
+            return owner_tasks_changes.get(self.request.user.pk)
+        if self.action == "comments":
+            return task_comments_changes.get(self.kwargs["pk"])
+        if self.action == "time_logs":
+            return task_time_logs_changes.get(self.kwargs["pk"])
+        return None
+
+    def get_keyset_ordering(self):
+        if self.action == "top":
+            return ("-last_month_duration", "-id")
+        return self.ordering
+
     def get_queryset(self):
         queryset = super().get_queryset()
         if self.action == "created":
-            queryset = queryset.annotate(total_duration=Subquery(TimeLog.objects.filter(task=OuterRef('id')).values(
-                'task').annotate(total=Sum('duration')).values('total'))).filter(user=self.request.user)
+            queryset = queryset.filter(user=self.request.user)
         if self.action == "my":
-            queryset = queryset.annotate(total_duration=Subquery(TimeLog.objects.filter(task=OuterRef('id')).values(
-                'task').annotate(total=Sum('duration')).values('total'))).filter(owner=self.request.user)
+            queryset = queryset.filter(owner=self.request.user)
         if self.action == "completed":
-            queryset = queryset.annotate(total_duration=Subquery(TimeLog.objects.filter(task=OuterRef('id')).values(
-                'task').annotate(total=Sum('duration')).values('total'))).filter(status=Task.Status.DONE)
+            queryset = queryset.filter(status=Task.Status.DONE)
         if self.action == "comments":
-            queryset = queryset.filter(task=self.kwargs.get("pk"))
-        if self.action == "list":
-            queryset = queryset.annotate(total_duration=Subquery(TimeLog.objects.filter(task=OuterRef('id')).values(
-                'task').annotate(total=Sum('duration')).values('total')))
+            # Served by the (task, id) index, with since_id only the newer rows are read.
+            queryset = queryset.filter(task=self.kwargs.get("pk")).order_by("id")
+            if (since_id := get_since_id(self.request)) is not None:
+                queryset = queryset.filter(id__gt=since_id)
         if self.action == "top":
-            queryset = queryset.filter(
-                owner=self.request.user,
-                timelogs__start_time__gte=timezone.now() - relativedelta(months=1),
-                timelogs__start_time__lte=timezone.now(),
-            ).annotate(total_duration=Sum('timelogs__duration'))
+            queryset = get_top_tasks(queryset, self.request.user)
         if self.action == "time_logs":
             queryset = queryset.filter(task=self.kwargs.get("pk"))
+        if self.action == "search":
+            queryset = search_tasks(queryset, get_search_query(self.request))
         return queryset
 
     @action(methods=['get'], detail=False, serializer_class=TaskListSerializer, url_path="created-tasks")
@@ -75,29 +145,150 @@ class TaskViewSet(viewsets.ModelViewSet):
     def completed(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    @swagger_auto_schema(manual_parameters=[search_query_parameter])
+    @action(methods=['get'], detail=False, serializer_class=TaskListSerializer, url_path="search")
+    def search(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @swagger_auto_schema(query_serializer=TaskExportSerializer)
+    @action(methods=['get'], detail=False, url_path="export", pagination_class=None, filter_backends=[])
+    def export(self, request):
+        serializer = TaskExportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        queryset = Task.objects.order_by("id")
+        if "owner" in params:
+            queryset = queryset.filter(owner=params["owner"])
+        if "status" in params:
+            queryset = queryset.filter(status=params["status"])
+        if "from" in params:
+            queryset = queryset.filter(updated_at__gte=start_of_day(params["from"]))
+        if "to" in params:
+            queryset = queryset.filter(updated_at__lt=start_of_day(params["to"] + timedelta(days=1)))
+        return export_response(queryset, TASK_EXPORT_FIELDS, params["output"], "tasks")
+
+    def retrieve(self, request, *args, **kwargs):
+        # "01" and "1" are the same task and must share one cache entry.
+        try:
+            task_id = int(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValueError:
+            raise Http404
+        data = get_cached_task_detail(task_id, lambda: self.get_serializer(self.get_object()).data)
+        return Response(data)
+
     @swagger_auto_schema(request_body=no_body)
     @action(methods=['patch'], detail=True, url_path="complete")
     def complete(self, request, *args, **kwargs):
         task = self.get_object()
         task.status = Task.Status.DONE
-        task.save()
-        send_notification(task.owner.email, "New commented task was complete!", "New task was assigned to You")
+        with transaction.atomic():
+            task.save()
+            send_notification(task.owner.email, "New commented task was complete!", "New task was assigned to You")
+            publish_event([task.owner_id, task.user_id], "task.completed", {"task": task.id})
         return Response({"success": True}, status=status.HTTP_200_OK)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user, owner=self.request.user)
 
+    @swagger_auto_schema(request_body=TaskSerializer(many=True), responses={201: TaskSerializer(many=True)})
+    @action(methods=['post'], detail=False, url_path="bulk-create")
+    def bulk_create(self, request):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        tasks = Task.objects.bulk_create(
+            [Task(**item, user=request.user, owner=request.user) for item in serializer.validated_data],
+            batch_size=self.bulk_batch_size,
+        )
+        owner_tasks_changes.bump([request.user.pk])
+        return Response(TaskSerializer(tasks, many=True).data, status=status.HTTP_201_CREATED)
+
+    @swagger_auto_schema(request_body=BulkTaskUpdateSerializer(many=True))
+    @action(methods=['patch'], detail=False, serializer_class=BulkTaskUpdateSerializer, url_path="bulk-update")
+    def bulk_update(self, request):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        ids = Counter(item["id"] for item in serializer.validated_data)
+        if duplicates := sorted(task_id for task_id, count in ids.items() if count > 1):
+            raise ValidationError({"id": [f"Tasks {duplicates} are listed more than once."]})
+        changes = {item.pop("id"): item for item in serializer.validated_data}
+        tasks = Task.objects.in_bulk(list(changes))
+        if missing := sorted(changes.keys() - tasks.keys()):
+            raise ValidationError({"id": [f"Tasks {missing} do not exist."]})
+        fields = set()
+        for task_id, values in changes.items():
+            for field, value in values.items():
+                setattr(tasks[task_id], field, value)
+                fields.add(field)
+        if fields:
+            # bulk_update() does not apply auto_now.
+            now = timezone.now()
+            for task in tasks.values():
+                task.updated_at = now
+            Task.objects.bulk_update(tasks.values(), sorted(fields | {"updated_at"}), batch_size=self.bulk_batch_size)
+            invalidate_tasks(tasks.keys())
+            # Top tasks render the title and description.
+            top_tasks_cache.invalidate({task.owner_id for task in tasks.values()} - {None})
+            owner_tasks_changes.bump(task.owner_id for task in tasks.values())
+        return Response({"success": True, "updated": len(tasks)})
+
+    @action(methods=['post'], detail=False, serializer_class=BulkTaskAssignSerializer, url_path="bulk-assign")
+    def bulk_assign(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids, user = serializer.validated_data["ids"], serializer.validated_data["user"]
+        with transaction.atomic():
+            # Tasks the assignee already owns are left alone and not counted as assigned.
+            reassigned = Task.objects.filter(pk__in=ids).exclude(owner=user)
+            previous = list(reassigned.values_list("id", "owner", "user"))
+            previous_owners = {owner_id for _, owner_id, _ in previous} - {None}
+            reassigned_ids = [task_id for task_id, _, _ in previous]
+            updated = reassigned.update(owner=user, updated_at=timezone.now())
+            TaskDailyDuration.objects.filter(task_id__in=reassigned_ids).update(owner=user)
+            touch_task_rows(reassigned_ids)
+            record_reassignments(previous, user.pk)
+            invalidate_tasks(reassigned_ids)
+            top_tasks_cache.invalidate(previous_owners | {user.pk})
+            owner_tasks_changes.bump(previous_owners | {user.pk})
+            if updated:
+                send_notification([user.email], "New tasks!", f"{updated} new tasks were assigned to You")
+        return Response({"success": True, "updated": updated})
+
+    @swagger_auto_schema(request_body=BulkTaskIdsSerializer)
+    @action(methods=['patch'], detail=False, serializer_class=BulkTaskIdsSerializer, url_path="bulk-complete")
+    def bulk_complete(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            # Tasks that are already done are left alone and not counted or notified again.
+            completed = Task.objects.filter(pk__in=serializer.validated_data["ids"]).exclude(status=Task.Status.DONE)
+            previous = list(completed.values_list("id", "owner_id", "owner__email"))
+            owners = [(owner_id, email) for _, owner_id, email in previous if owner_id is not None]
+            completed_per_owner = Counter(email for _, email in owners)
+            updated = completed.update(status=Task.Status.DONE, updated_at=timezone.now())
+            invalidate_tasks([task_id for task_id, _, _ in previous])
+            owner_tasks_changes.bump(owner_id for owner_id, _ in owners)
+            send_notifications([
+                (email, "Tasks were completed!", f"{count} of your tasks were completed")
+                for email, count in completed_per_owner.items()
+            ])
+        return Response({"success": True, "updated": updated})
+
     @action(methods=['post'], detail=True, serializer_class=TaskAssignSerializer, url_path="assign")
     def assign(self, request, *args, **kwargs):
         task = self.get_object()
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data["user"]
+        previous_owner_id = task.owner_id
         task.owner = user
-        task.save()
-        send_notification([task.owner.email], "New task!", "New task was assigned to You")
+        with transaction.atomic():
+            task.save()
+            send_notification([task.owner.email], "New task!", "New task was assigned to You")
+            publish_event([user.pk, previous_owner_id], "task.assigned",
+                          {"task": task.id, "owner": user.pk, "previous_owner": previous_owner_id})
         return Response({"success": True, 'message': f'Task {task.title} assigned to user {user.get_full_name()}'})
 
+    @swagger_auto_schema(query_serializer=CommentSinceSerializer)
     @action(methods=['get'], detail=True, serializer_class=AllCommentSerializer, url_path="comments",
             queryset=Comment.objects.all(), search_fields=None)
     def comments(self, request, *args, **kwargs):
@@ -107,35 +298,101 @@ class TaskViewSet(viewsets.ModelViewSet):
     def time_logs(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
-    @action(methods=['get'], detail=False, url_path="top")
+    @action(methods=['get'], detail=False, serializer_class=TopTaskSerializer, url_path="top")
     def top(self, request):
-        if cache_data := cache.get("top_tasks"):
-            return Response(cache_data, status=status.HTTP_200_OK)
-        top_tasks = self.get_queryset().order_by("-total_duration")[:20]
-        serializer = self.get_serializer(top_tasks, many=True).data
-        cache.set("top_tasks", serializer, 60)
-        return Response(serializer, status=status.HTTP_200_OK)
+        if self.paginator.use_keyset(request):
+            return super().list(request)
+        return Response(self.get_cached_top(request.user), status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(query_serializer=SyncSerializer)
+    @action(methods=['get'], detail=False, url_path="changes", pagination_class=None, filter_backends=[])
+    def changes(self, request):
+        """
+        Tasks of the user (owned or created) and their comments and time logs that changed after
+        `sync_token`, and what was deleted. Call again with the returned token while `has_more` is true,
+        apply `deleted` before the other kinds.
+        """
+        serializer = SyncSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        changes, cursors, has_more = get_changes(request.user, params.get("sync_token"), params["limit"])
+        context = self.get_serializer_context()
+        return Response({
+            "tasks": TaskSyncSerializer(changes["tasks"], many=True, context=context).data,
+            "comments": CommentSyncSerializer(changes["comments"], many=True, context=context).data,
+            "time_logs": TimeLogSyncSerializer(changes["time_logs"], many=True, context=context).data,
+            "deleted": TombstoneSerializer(changes["deleted"], many=True, context=context).data,
+            "sync_token": encode_sync_token(cursors),
+            "has_more": has_more,
+        })
 
+    def get_cached_top(self, user):
+        # Serializer classes are explicit, the dashboard calls this from pool threads with another action.
+        return top_tasks_cache.get(user.pk, lambda: list(TopTaskSerializer(
+            get_top_tasks(Task.objects.all(), user).order_by("-last_month_duration")[:20],
+            many=True, context=self.get_serializer_context(),
+        ).data))
 
-class CommentViewSet(viewsets.ModelViewSet):
+    @swagger_auto_schema(query_serializer=DashboardSerializer)
+    @action(methods=['get'], detail=False, url_path="dashboard", pagination_class=None, filter_backends=[])
+    def dashboard(self, request):
+        serializer = DashboardSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        user, context = request.user, self.get_serializer_context()
+
+        def task_list(queryset, limit):
+            return lambda: list(TaskListSerializer(queryset.order_by("id")[:limit], many=True, context=context).data)
+
+        # Independent sections, the response takes about as long as the slowest one.
+        return Response(run_concurrently({
+            "my": task_list(Task.objects.filter(owner=user), params["my_limit"]),
+            "created": task_list(Task.objects.filter(user=user), params["created_limit"]),
+            "top": lambda: self.get_cached_top(user)[:params["top_limit"]],
+            "time_logged": lambda: {
+                "total_time_logged": get_time_logged(user, params["from"], params["to"]) or 0,
+                "from": params["from"],
+                "to": params["to"],
+            },
+        }))
+
+
+class CommentViewSet(SerializerTimingMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = AllCommentSerializer
+    values_list_actions = ("list", "search")
 
     def get_serializer_class(self):
         if self.action == "create":
             return CreateCommentSerializer
         return super().get_serializer_class()
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "search":
+            queryset = search_comments(queryset, get_search_query(self.request))
+        return queryset
+
+    @swagger_auto_schema(manual_parameters=[search_query_parameter])
+    @action(methods=['get'], detail=False, url_path="search")
+    def search(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        comment = serializer.save(user=self.request.user)
         task_id = self.request.data['task']
         task = get_object_or_404(Task, id=task_id)
         send_notification([task.owner.email], "New comment!", "You task was commented")
+        publish_event([task.owner_id, task.user_id], "comment.created",
+                      {"task": task.id, "comment": comment.id, "user": comment.user_id})
 
 
-class TimerViewSet(viewsets.ModelViewSet):
+class TimerViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
     queryset = TimeLog.objects.all()
     serializer_class = CreateTimeLogSerializer
+    bulk_max_items = 10000
+    bulk_batch_size = 1000
 
     def get_serializer_class(self):
         if self.action == "add_time_log_manually":
@@ -147,26 +404,24 @@ class TimerViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         queryset = super().get_queryset()
         if self.action == "get_time_logged_last_month":
-            queryset = TimeLog.objects.filter(
-                task__owner=self.request.user,
-                start_time__gte=timezone.now() - relativedelta(months=1),
-                start_time__lte=timezone.now(),
-                user=self.request.user,
-            ).aggregate(total=Sum('duration')).get('total')
+            queryset = get_time_logged(self.request.user, self.date_range["from"], self.date_range["to"])
 
         return queryset
 
     def perform_create(self, serializer):
         task = serializer.validated_data['task']
-        task.status = Task.Status.IN_PROGRESS
-        task.save()
-        serializer.save(user=self.request.user)
+        time_log = serializer.save(user=self.request.user)
+        publish_event([time_log.user_id, task.owner_id], "timer.started",
+                      {"task": task.id, "time_log": time_log.id, "start_time": time_log.start_time})
 
     @action(methods=['post'], detail=False, url_path="stop")
     def stop(self, request):
         serializer = self.get_serializer(data=self.request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        time_log = serializer.save()
+        task = serializer.validated_data["task"]
+        publish_event([time_log.user_id, task.owner_id], "timer.stopped",
+                      {"task": task.id, "time_log": time_log.id, "duration": time_log.duration})
         return Response({"detail": "Timer was stopped successfully"})
 
     @action(methods=['post'], detail=False, url_path="manually")
@@ -176,7 +431,80 @@ class TimerViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @swagger_auto_schema(request_body=BulkTimeLogSerializer(many=True))
+    @action(methods=['post'], detail=False, serializer_class=BulkTimeLogSerializer, url_path="bulk",
+            parser_classes=[ORJSONParser, NDJSONParser])
+    def bulk(self, request):
+        """
+        Create many time logs from a JSON array or an NDJSON body. Valid entries are
+        inserted with one bulk INSERT, the response reports the result of every entry.
+        """
+        if not isinstance(request.data, list):
+            raise ValidationError({"detail": "Expected a list of time logs."})
+        if len(request.data) > self.bulk_max_items:
+            raise ValidationError({"detail": f"At most {self.bulk_max_items} time logs per request."})
+
+        results = [None] * len(request.data)
+        entries = []
+        # One serializer instance validates every entry, building its fields once.
+        serializer = self.get_serializer()
+        for index, item in enumerate(request.data):
+            try:
+                entries.append((index, serializer.run_validation(item)))
+            except ValidationError as exc:
+                results[index] = {"index": index, "errors": exc.detail}
+
+        task_ids = {data["task"] for _, data in entries}
+        existing_tasks = set(Task.objects.filter(pk__in=task_ids).values_list("pk", flat=True))
+        time_logs = []
+        for index, data in entries:
+            if data["task"] not in existing_tasks:
+                error = f'Invalid pk "{data["task"]}" - object does not exist.'
+                results[index] = {"index": index, "errors": {"task": [error]}}
+                continue
+            time_logs.append((index, TimeLog(
+                task_id=data["task"],
+                start_time=data["start_time"],
+                end_time=data.get("end_time"),
+                duration=data["duration"],
+                user=request.user,
+            )))
+
+        with transaction.atomic():
+            TimeLog.objects.bulk_create([time_log for _, time_log in time_logs], batch_size=self.bulk_batch_size)
+            added = [time_log.get_state() for _, time_log in time_logs]
+            time_logs_changed.send(sender=TimeLog, removed=[], added=added)
+        for index, time_log in time_logs:
+            results[index] = {"index": index, "id": time_log.pk}
+
+        return Response({"created": len(time_logs), "failed": len(results) - len(time_logs), "results": results})
+
+    @swagger_auto_schema(query_serializer=TimeLogExportSerializer)
+    @action(methods=['get'], detail=False, url_path="export", pagination_class=None, filter_backends=[])
+    def export(self, request):
+        serializer = TimeLogExportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        queryset = TimeLog.objects.order_by("id")
+        if "owner" in params:
+            queryset = queryset.filter(task__owner=params["owner"])
+        if "status" in params:
+            queryset = queryset.filter(task__status=params["status"])
+        if "from" in params:
+            queryset = queryset.filter(start_time__gte=start_of_day(params["from"]))
+        if "to" in params:
+            queryset = queryset.filter(start_time__lt=start_of_day(params["to"] + timedelta(days=1)))
+        return export_response(queryset, TIME_LOG_EXPORT_FIELDS, params["output"], "time_logs")
+
+    @swagger_auto_schema(query_serializer=DateRangeSerializer)
     @action(methods=['get'], detail=False, serializer_class=None, url_path="time-logged-last-month")
     def get_time_logged_last_month(self, request):
+        serializer = DateRangeSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        self.date_range = serializer.validated_data
         total_time_logged = self.get_queryset()
-        return Response({"total_time_logged": total_time_logged or 0})
+        return Response({
+            "total_time_logged": total_time_logged or 0,
+            "from": self.date_range["from"],
+            "to": self.date_range["to"],
+        })
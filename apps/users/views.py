@@ -2,10 +2,11 @@ from django.contrib.auth.models import User
 from rest_framework.permissions import AllowAny
 from rest_framework import viewsets
 
+from apps.common.metrics import SerializerTimingMixin
 from apps.users.serializers import UserSerializer, UserListSerializer
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
     permission_classes = (AllowAny,)
     authentication_classes = ()
     serializer_class = UserListSerializer
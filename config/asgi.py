@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after setup, the event stream uses the models through authentication.
+from apps.common.asgi import EventStreamApplication, PathRouter  # noqa: E402
+
+application = PathRouter({'/events': EventStreamApplication()}, django_application)
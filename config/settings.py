@@ -38,7 +38,20 @@ EMAIL_PORT = env('EMAIL_PORT', default=587, cast=int)
 EMAIL_USE_TLS = env('EMAIL_USE_TLS', default=True, cast=bool)
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 
-ALLOWED_HOSTS = []
+# Notifications are queued in apps.common.models.OutboxEmail and sent by `manage.py send_notifications`.
+OUTBOX_BATCH_SIZE = env('OUTBOX_BATCH_SIZE', default=100, cast=int)
+OUTBOX_MAX_ATTEMPTS = env('OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+OUTBOX_RETRY_DELAY = env('OUTBOX_RETRY_DELAY', default=30, cast=int)
+OUTBOX_LEASE_SECONDS = env('OUTBOX_LEASE_SECONDS', default=300, cast=int)
+
+# apps.common.middlewares.PerformanceMiddleware logs the repeated queries of requests above these limits.
+PERFORMANCE_MAX_QUERIES = env('PERFORMANCE_MAX_QUERIES', default=30, cast=int)
+PERFORMANCE_SLOW_REQUEST_MS = env('PERFORMANCE_SLOW_REQUEST_MS', default=500, cast=int)
+
+# Threads apps.common.concurrency.run_concurrently() shares between requests (TaskViewSet.dashboard).
+CONCURRENT_SECTIONS_WORKERS = env('CONCURRENT_SECTIONS_WORKERS', default=8, cast=int)
+
+ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', default=[])
 
 
 # Application definition
@@ -54,6 +67,7 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt',
     'rest_framework.authtoken',
     'drf_yasg',
+    'apps.common',
     'apps.tasks',
     'apps.users',
     'django_filters',
@@ -63,13 +77,22 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.common.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        'apps.common.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'apps.common.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'apps.common.pagination.OptionalKeysetPagination',
     'PAGE_SIZE': 100
 }
 
@@ -84,6 +107,12 @@ SWAGGER_SETTINGS = {
     },
 }
 
+# Users of JWT requests are cached by apps.common.authentication.CachedJWTAuthentication. Changes made
+# in one process reach the others' in-process copies after AUTH_USER_CACHE_LOCAL_TTL seconds.
+AUTH_USER_CACHE_SIZE = env('AUTH_USER_CACHE_SIZE', default=1024, cast=int)
+AUTH_USER_CACHE_LOCAL_TTL = env('AUTH_USER_CACHE_LOCAL_TTL', default=5, cast=int)
+AUTH_USER_CACHE_TTL = env('AUTH_USER_CACHE_TTL', default=300, cast=int)
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=7),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -92,6 +121,7 @@ SIMPLE_JWT = {
 }
 
 MIDDLEWARE = [
+    'apps.common.middlewares.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -137,12 +167,16 @@ DATABASES = {
         'PASSWORD': env('DB_PASSWORD'),
         'HOST': env('DB_HOST'),
         'PORT': env('DB_PORT', default=5432, cast=int),
+        # Keep connections open between requests, each worker thread holds its own.
+        'CONN_MAX_AGE': env('DB_CONN_MAX_AGE', default=60, cast=int),
     }
 }
+# Django 3.2 has no CONN_HEALTH_CHECKS, apps.common.signals checks reused connections per request.
+DB_CONN_HEALTH_CHECKS = env('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
 
 CACHES = {
     "default": {
-        "BACKEND": "django_redis.cache.RedisCache",
+        "BACKEND": "apps.common.cache.InstrumentedRedisCache",
         "LOCATION": "redis://redis:6379",
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
@@ -150,6 +184,51 @@ CACHES = {
     }
 }
 CACHE_TTL = 60
+# Entries of TaskViewSet.retrieve are invalidated on every write, the TTL only bounds memory.
+TASK_DETAIL_CACHE_TTL = env('TASK_DETAIL_CACHE_TTL', default=3600, cast=int)
+# Versions outlive the entries stored under them, an expired version only costs a miss.
+TASK_DETAIL_VERSION_TTL = env('TASK_DETAIL_VERSION_TTL', default=2 * TASK_DETAIL_CACHE_TTL, cast=int)
+# Per-user `top` results are recomputed after the TTL, the previous value is served meanwhile.
+TOP_TASKS_CACHE_TTL = env('TOP_TASKS_CACHE_TTL', default=60, cast=int)
+TOP_TASKS_CACHE_STALE_TTL = env('TOP_TASKS_CACHE_STALE_TTL', default=300, cast=int)
+
+# Delta sync (TaskViewSet.changes): rows changed this recently are left for the next call so transactions
+# still in flight are not skipped; tombstones are kept this long, older sync tokens must start over. On
+# PostgreSQL the cursors also stay before the oldest open writing transaction, elsewhere transactions writing
+# synced rows must commit within SYNC_SETTLE_SECONDS (apps.tasks.sync.get_sync_until).
+SYNC_SETTLE_SECONDS = env('SYNC_SETTLE_SECONDS', default=2, cast=int)
+SYNC_TOMBSTONE_RETENTION_DAYS = env('SYNC_TOMBSTONE_RETENTION_DAYS', default=90, cast=int)
+
+# Server-sent events on /events (config.asgi), published with apps.common.events.publish_event(). The Redis
+# layer reaches the streams of every worker, apps.common.events.InMemoryChannelLayer only those of its process.
+EVENTS_CHANNEL_LAYER = {
+    "BACKEND": env('EVENTS_BACKEND', default='apps.common.events.RedisChannelLayer'),
+    "CONFIG": {
+        "url": env('EVENTS_REDIS_URL', default='redis://redis:6379'),
+    },
+}
+# Idle streams get a comment line this often, so proxies and clients notice dropped connections.
+EVENTS_KEEPALIVE_SECONDS = env('EVENTS_KEEPALIVE_SECONDS', default=15, cast=int)
+# Browsers open /events?ticket=... with a single-use ticket from POST /common/events/ticket, JWTs are only
+# accepted in the Authorization header so they never reach the access log.
+EVENTS_TICKET_TTL = env('EVENTS_TICKET_TTL', default=30, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'apps.performance': {
+            'handlers': ['console'],
+            'level': env('PERFORMANCE_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
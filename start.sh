@@ -1,2 +1,13 @@
 python /app/manage.py migrate
-python /app/manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+
+# SERVER=runserver keeps the auto-reloading development server.
+if [ "${SERVER:-gunicorn}" = "runserver" ]; then
+    exec python /app/manage.py runserver 0.0.0.0:8000
+fi
+
+# exec hands the container's signals to gunicorn, TERM then shuts down gracefully.
+if [ "${SERVER_INTERFACE:-wsgi}" = "asgi" ]; then
+    exec gunicorn config.asgi:application -c /app/config/gunicorn.conf.py --chdir /app \
+        --worker-class uvicorn.workers.UvicornWorker
+fi
+exec gunicorn config.wsgi:application -c /app/config/gunicorn.conf.py --chdir /app